@@ -1,17 +1,43 @@
-from flask import Flask, render_template, request, jsonify, send_file
+import time
+STARTUP_START = time.perf_counter()
+
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 import os
-import pandas as pd
-from generate_pdf_testing_AN import process_analiza_nastave, generate_pdf_an
-from generate_pdf_testing_EDN import process_excel as process_edn, generate_pdf_edn
-from generate_pdf_izvestaj_o_radu_konacno import process_excel as process_izvestaj, generate_pdf_testing_test1 as generate_pdf_izvestaj
-from generate_pdf_testing_OP import process_excel as process_op, generate_pdf_testing_test1 as generate_pdf_op
 import traceback
 import base64
-from generatorpdfkonacno import generate_pdf
 from datetime import datetime
-from zipfile import ZipFile
+import io
+from zipfile import ZipFile, ZIP_STORED, BadZipFile
+from collections import OrderedDict
+import hashlib
+import pickle
+import threading
+import importlib
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from waitress import create_server
 
-from waitress import serve
+import pdf_cache
+import progress
+import metrics
+
+# pandas, openpyxl, reportlab and the report modules are heavy to import, so they are
+# imported inside the routes on first use (and warmed in the background by warm_up()).
+REPORT_MODULES = [
+    "workbook_utils",
+    "pdf_styles",
+    "generate_pdf_testing_AN",
+    "generate_pdf_testing_EDN",
+    "generate_pdf_izvestaj_o_radu_konacno",
+    "generate_pdf_testing_OP",
+    "generatorpdfkonacno",
+    "reports",
+]
+STARTUP_LOG = 'startup_times.log'
+WAITRESS_THREADS = int(os.environ.get('WAITRESS_THREADS', 16))
 
 app = Flask(__name__, static_folder='static')
 
@@ -22,13 +48,225 @@ os.makedirs(PDF_FOLDER, exist_ok=True)
 
 ALLOWED_EXTENSIONS = {'xls', 'xlsx'}
 
+# Report types of /generate/<report_type> and the file name they are downloaded as
+REPORT_DOWNLOAD_NAMES = {
+    'an': "analiza_nastave.pdf",
+    'edn': "evidencija_drzanja_nastave.pdf",
+    'izvestaj': "izvestaj_o_radu.pdf",
+    'op': "osnovni_podaci.pdf",
+}
+ALL_REPORTS_FORMATS = {'pdf', 'zip'}
+
+# Parsed uploads, keyed by the SHA-256 of the uploaded file's content: department workbooks split per
+# professor, and the data extracted for each report of a teacher's workbook
+WORKBOOK_CACHE_MAX_ENTRIES = 16
+WORKBOOK_CACHE_MAX_BYTES = 256 * 1024 * 1024
+workbook_cache = OrderedDict()
+workbook_cache_lock = threading.Lock()
+
+# Worker processes used to render the department batch (/procesiranjesvih)
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 1))
+batch_pool = None
+batch_pool_lock = threading.Lock()
+
+# Background department batches (/procesiranjesvih/jobs). job_runner threads only coordinate a job,
+# the PDFs themselves are rendered in batch_pool.
+BATCH_JOBS_FOLDER = os.path.join(PDF_FOLDER, 'jobs')
+os.makedirs(BATCH_JOBS_FOLDER, exist_ok=True)
+BATCH_JOB_TTL = 60 * 60
+batch_jobs = {}
+batch_jobs_lock = threading.Lock()
+job_runner = ThreadPoolExecutor(max_workers=2, thread_name_prefix='batch-job')
+
+# Bulk upload of teachers' workbooks (/generate_bulk), Excel files or ZIP archives of them
+BULK_MAX_WORKBOOKS = int(os.environ.get('BULK_MAX_WORKBOOKS', 200))
+# Limits on the unpacked size of one workbook and of all of them, checked before anything is read
+BULK_MAX_FILE_BYTES = int(os.environ.get('BULK_MAX_FILE_MB', 50)) * 1024 * 1024
+BULK_MAX_TOTAL_BYTES = int(os.environ.get('BULK_MAX_TOTAL_MB', 500)) * 1024 * 1024
+
+# /metrics only answers requests made on the server itself
+LOCAL_ADDRESSES = {'127.0.0.1', '::1'}
+
+class BulkUploadTooLarge(ValueError):
+    # The bulk upload goes over BULK_MAX_WORKBOOKS or the size limits, the message is shown to the user
+    pass
+
+class ZipStream(io.RawIOBase):
+    # Write-only, unseekable sink for ZipFile: the written bytes are collected and handed out with pop()
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def read_upload(file, filepath):
+    # A copy is kept in uploads/, but the workbook is always parsed from the bytes of this request,
+    # so concurrent uploads with the same file name can't swap workbooks
+    with metrics.span('upload', request.endpoint):
+        file.save(filepath)
+        file.stream.seek(0)
+        return file.read()
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def get_cached(key, loader):
+    # LRU cache of the parsed uploads; loader() returns (value, size_in_bytes)
+    with workbook_cache_lock:
+        if key in workbook_cache:
+            workbook_cache.move_to_end(key)
+            return workbook_cache[key][0]
+
+    value, size = loader()
+
+    with workbook_cache_lock:
+        workbook_cache[key] = (value, size)
+        workbook_cache.move_to_end(key)
+        # Evict least recently used entries until we are back under both limits
+        total_size = sum(entry_size for _, entry_size in workbook_cache.values())
+        while workbook_cache and (len(workbook_cache) > WORKBOOK_CACHE_MAX_ENTRIES or total_size > WORKBOOK_CACHE_MAX_BYTES):
+            _, (_, evicted_size) = workbook_cache.popitem(last=False)
+            total_size -= evicted_size
+    return value
+
+def load_workbook_sheets(data):
+    # The uploaded workbook opened in openpyxl read-only mode. The process_* functions stream only the
+    # sheets they need from it, a block of rows at a time, so a request never holds a whole sheet in memory.
+    from workbook_utils import open_workbook
+    with metrics.span('parse', 'workbook'):
+        return open_workbook(io.BytesIO(data))
+
+def load_reports(data, report_types, selected_sheet=None):
+    # {report_type: (data, professor_name)} for every report in report_types, data is None if the workbook
+    # has nothing usable for the report. Cached by (content hash, report type, sheet), so clicking again
+    # on the same upload doesn't read it again; the workbook is opened once, and only if some report
+    # isn't cached yet. The cached data is shared by requests, the generators only read it.
+    import reports
+
+    data_hash = content_hash(data)
+    workbook = None
+    extracted = {}
+    try:
+        for report_type in report_types:
+            sheet = selected_sheet if report_type == 'izvestaj' else None
+
+            def loader():
+                nonlocal workbook
+                if workbook is None:
+                    workbook = load_workbook_sheets(data)
+                try:
+                    report = reports.extract_report(report_type, workbook, sheet)
+                except Exception as e:
+                    # The same bytes always fail the same way, so the failure is cached too
+                    print(f"Error processing {report_type} data: {str(e)}")
+                    report = (None, None)
+                return report, len(pickle.dumps(report))
+
+            extracted[report_type] = get_cached(('report', data_hash, report_type, sheet), loader)
+    finally:
+        if workbook is not None:
+            workbook.close()
+    return extracted
+
+def load_department(data):
+    # The department workbook split once into per-professor frames, already projected to
+    # OPTERECENJE_COLUMNS. Returns None if there is no 'Ime Predavača' column.
+    import pandas as pd
+    from generatorpdfkonacno import OPTERECENJE_COLUMNS
+
+    @metrics.timed('parse', 'opterecenje')
+    def loader():
+        df = pd.read_excel(io.BytesIO(data))
+        if 'Ime Predavača' not in df.columns:
+            return None, 0
+        projected = df[OPTERECENJE_COLUMNS]
+        # sort=False keeps the professors in the order they first appear in the sheet
+        professors = {name: group for name, group in projected.groupby('Ime Predavača', sort=False)}
+        return professors, int(projected.memory_usage(deep=True).sum())
+
+    return get_cached(('department', content_hash(data)), loader)
+
+def report_response(report_type, pdf_bytes, professor_name, selected_sheet=None):
+    response = send_file(io.BytesIO(pdf_bytes), as_attachment=True, download_name=REPORT_DOWNLOAD_NAMES[report_type], mimetype="application/pdf")
+    encoded_name = base64.b64encode(professor_name.encode('utf-8')).decode('ascii')
+    response.headers['Professor-Name'] = encoded_name
+    if selected_sheet:
+        response.headers['Selected-Sheet'] = selected_sheet
+    return response
+
+def get_batch_pool():
+    global batch_pool
+    with batch_pool_lock:
+        if batch_pool is None:
+            from generatorpdfkonacno import init_worker
+            # spawn behaves the same on Windows and Linux and doesn't fork waitress' threads
+            batch_pool = ProcessPoolExecutor(
+                max_workers=BATCH_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker
+            )
+        return batch_pool
+
+def reset_batch_pool():
+    # A worker died (e.g. out of memory), the pool can't be used anymore
+    global batch_pool
+    with batch_pool_lock:
+        if batch_pool is not None:
+            batch_pool.shutdown(wait=False, cancel_futures=True)
+            batch_pool = None
+
+def time_requests(wsgi_app):
+    # WSGI middleware for the send and request spans. They end when waitress closes the response,
+    # after the whole body is sent (Flask's call_on_close is skipped for send_file responses).
+    # send is the time from the view returning to the end of the body, request the whole request.
+    from werkzeug.wsgi import ClosingIterator
+
+    def timed_app(environ, start_response):
+        request_start = time.perf_counter()
+        body = wsgi_app(environ, start_response)
+        handled = time.perf_counter()
+
+        def record():
+            sent = time.perf_counter()
+            endpoint = environ.get('metrics.endpoint') or 'unknown'
+            metrics.observe('send', sent - handled, endpoint)
+            metrics.observe('request', sent - request_start, endpoint)
+
+        return ClosingIterator(body, record)
+    return timed_app
+
+app.wsgi_app = time_requests(app.wsgi_app)
+
+@app.before_request
+def set_metrics_endpoint():
+    request.environ['metrics.endpoint'] = request.endpoint
+
 @app.route('/', methods=['GET'])
 def index():
     return render_template('index.html')
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Stage timing histograms (metrics.py) as Prometheus text, or as JSON with ?format=json.
+    # Requests forwarded by a reverse proxy come from its local address, they are told apart by X-Forwarded-For.
+    if request.remote_addr not in LOCAL_ADDRESSES or 'X-Forwarded-For' in request.headers:
+        return jsonify({'error': 'Zabranjen pristup.'}), 403
+    if request.args.get('format') == 'json':
+        return jsonify(metrics.snapshot())
+    return Response(metrics.render_text(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/get_available_sheets', methods=['POST'])
 def get_available_sheets():
     if 'excel_file' not in request.files:
@@ -40,19 +278,36 @@ def get_available_sheets():
     
     if not allowed_file(file.filename):
         return jsonify({'error': 'Neispravan format fajla. Učitajte Excel fajl'}), 400
-    
-    filename = file.filename
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(filepath)
 
     try:
-        _, _, available_sheets = process_izvestaj(filepath)
+        from workbook_utils import get_monthly_sheets
+
+        # Only the sheet catalogue is read, straight from the upload stream
+        available_sheets = get_monthly_sheets(file.stream)
         return jsonify({'sheets': available_sheets})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/progress/<progress_id>', methods=['GET'])
+def progress_events(progress_id):
+    # Server-sent events with the progress of the request (or batch job) that uses this id
+    if not progress.valid_id(progress_id):
+        return jsonify({'error': 'Neispravan identifikator.'}), 400
+    return Response(
+        stream_with_context(progress.stream(progress_id)),
+        mimetype="text/event-stream",
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/generate/<report_type>', methods=['POST'])
 def generate_report(report_type):
+    progress_id = request.form.get('progress_id')
+    try:
+        return build_report(report_type, progress_id)
+    finally:
+        progress.close(progress_id)
+
+def build_report(report_type, progress_id):
     if 'excel_file' not in request.files:
         return jsonify({'error': 'No file part'}), 400
     
@@ -63,51 +318,64 @@ def generate_report(report_type):
     if not allowed_file(file.filename):
         return jsonify({'error': 'Neispravan format fajla. Učitajte Excel fajl'}), 400
     
+    if report_type not in REPORT_DOWNLOAD_NAMES:
+        return jsonify({'error': 'Nepoznat tip izveštaja'}), 400
+
     filename = file.filename
     filepath = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(filepath)
+    data = read_upload(file, filepath)
+    progress.publish(progress_id, 'upload', 'Fajl je učitan.')
+    selected_sheet = request.form.get('selected_sheet') if report_type == 'izvestaj' else None
 
     try:
+        # Same workbook, report and sheet as before: the finished PDF comes straight from disk
+        cache_key = pdf_cache.make_key(content_hash(data), report_type, selected_sheet)
+        cached = pdf_cache.get(cache_key)
+        if cached:
+            progress.publish(progress_id, 'cached', 'PDF je već generisan, preuzimanje...')
+            pdf_bytes, meta = cached
+            return report_response(report_type, pdf_bytes, meta['professor_name'], selected_sheet)
+
+        report_data, professor_name = load_reports(data, [report_type], selected_sheet)[report_type]
+        progress.publish(progress_id, 'parsed', 'Excel fajl je obrađen, generisanje PDF-a...')
+
         if report_type == 'an':
             # Analiza nastave
-            tables_data, professor_name = process_analiza_nastave(filepath)
+            from generate_pdf_testing_AN import generate_pdf_an
+            tables_data = report_data
             if tables_data and professor_name:
-                pdf_path = os.path.join(PDF_FOLDER, "analiza_nastave.pdf")
-                generate_pdf_an(tables_data, pdf_path, professor_name)
-                response = send_file(pdf_path, as_attachment=True, download_name="analiza_nastave.pdf", mimetype="application/pdf")
-                encoded_name = base64.b64encode(professor_name.encode('utf-8')).decode('ascii')
-                response.headers['Professor-Name'] = encoded_name
-                return response
+                pdf_buffer = io.BytesIO()
+                generate_pdf_an(tables_data, pdf_buffer, professor_name)
+                pdf_bytes = pdf_buffer.getvalue()
+                pdf_cache.put(cache_key, pdf_bytes, {'professor_name': professor_name})
+                return report_response(report_type, pdf_bytes, professor_name)
             else:
                 return jsonify({'error': 'Greška u obradi podataka za Analizu nastave'}), 500
 
         elif report_type == 'edn':
             # Evidencija držanja nastave
-            table_data, professor_name = process_edn(filepath)
+            from generate_pdf_testing_EDN import generate_pdf_edn
+            table_data = report_data
             if table_data and professor_name:
-                pdf_path = os.path.join(PDF_FOLDER, "evidencija_drzanja_nastave.pdf")
-                generate_pdf_edn(table_data, pdf_path, professor_name)
-                response = send_file(pdf_path, as_attachment=True, download_name="evidencija_drzanja_nastave.pdf", mimetype="application/pdf")
-                encoded_name = base64.b64encode(professor_name.encode('utf-8')).decode('ascii')
-                response.headers['Professor-Name'] = encoded_name
-                return response
+                pdf_buffer = io.BytesIO()
+                generate_pdf_edn(table_data, pdf_buffer, professor_name)
+                pdf_bytes = pdf_buffer.getvalue()
+                pdf_cache.put(cache_key, pdf_bytes, {'professor_name': professor_name})
+                return report_response(report_type, pdf_bytes, professor_name)
             else:
                 return jsonify({'error': 'Greška u obradi podataka za Evidenciju držanja nastave'}), 500
 
         elif report_type == 'izvestaj':
             # Izveštaj o radu
+            from generate_pdf_izvestaj_o_radu_konacno import generate_pdf_testing_test1 as generate_pdf_izvestaj
             try:
-                selected_sheet = request.form.get('selected_sheet')
-                extracted_data, professor_name, _ = process_izvestaj(filepath, selected_sheet)
+                extracted_data = report_data
                 if extracted_data and professor_name:
-                    pdf_path = os.path.join(PDF_FOLDER, "izvestaj_o_radu.pdf")
-                    generate_pdf_izvestaj(extracted_data, pdf_path, professor_name)
-                    response = send_file(pdf_path, as_attachment=True, download_name="izvestaj_o_radu.pdf", mimetype="application/pdf")
-                    encoded_name = base64.b64encode(professor_name.encode('utf-8')).decode('ascii')
-                    response.headers['Professor-Name'] = encoded_name
-                    if selected_sheet:
-                        response.headers['Selected-Sheet'] = selected_sheet
-                    return response
+                    pdf_buffer = io.BytesIO()
+                    generate_pdf_izvestaj(extracted_data, pdf_buffer, professor_name)
+                    pdf_bytes = pdf_buffer.getvalue()
+                    pdf_cache.put(cache_key, pdf_bytes, {'professor_name': professor_name})
+                    return report_response(report_type, pdf_bytes, professor_name, selected_sheet)
                 else:
                     return jsonify({'error': 'Greška u obradi podataka za Izveštaj o radu'}), 500
             except Exception as e:
@@ -117,32 +385,15 @@ def generate_report(report_type):
 
         elif report_type == 'op':
             # Osnovni podaci
+            from generate_pdf_testing_OP import generate_pdf_testing_test1 as generate_pdf_op
             try:
-                extracted_data = process_op(filepath)
+                extracted_data = report_data
                 if extracted_data:
-                    # Get professor name from the first sheet's data
-                    first_sheet_data = next(iter(extracted_data.values()))
-                    name_data = {"first_name": "", "last_name": ""}
-                    
-                    # Extract professor's name from "Osnovni podaci" section
-                    for row in first_sheet_data.get("Osnovni podaci", []):
-                        if len(row) > 1:  # Ensure row has both label and value
-                            label = str(row[0]).strip().lower()
-                            value = str(row[1]).strip()
-                            
-                            if "ime" in label and not name_data["first_name"]:
-                                name_data["first_name"] = value
-                            elif "prezime" in label and not name_data["last_name"]:
-                                name_data["last_name"] = value
-                    
-                    professor_name = f"{name_data['first_name']} {name_data['last_name']}".strip()
-                    
-                    pdf_path = os.path.join(PDF_FOLDER, "osnovni_podaci.pdf")
-                    generate_pdf_op(extracted_data, pdf_path)
-                    response = send_file(pdf_path, as_attachment=True, download_name="osnovni_podaci.pdf", mimetype="application/pdf")
-                    encoded_name = base64.b64encode(professor_name.encode('utf-8')).decode('ascii')
-                    response.headers['Professor-Name'] = encoded_name
-                    return response
+                    pdf_buffer = io.BytesIO()
+                    generate_pdf_op(extracted_data, pdf_buffer)
+                    pdf_bytes = pdf_buffer.getvalue()
+                    pdf_cache.put(cache_key, pdf_bytes, {'professor_name': professor_name})
+                    return report_response(report_type, pdf_bytes, professor_name)
                 else:
                     return jsonify({'error': 'Greška u obradi podataka za Osnovne podatke'}), 500
             except Exception as e:
@@ -150,45 +401,231 @@ def generate_report(report_type):
                 traceback.print_exc()
                 return jsonify({'error': f'Greška u obradi podataka za Osnovne podatke: {str(e)}'}), 500
 
+    except Exception as e:
+        return jsonify({'error': f'Neuspelo procesiranje fajla: {str(e)}'}), 500
+
+@app.route('/generate_all', methods=['POST'])
+def generate_all_reports():
+    progress_id = request.form.get('progress_id')
+    try:
+        return build_all_reports(progress_id)
+    finally:
+        progress.close(progress_id)
+
+def build_all_reports(progress_id):
+    # Every report of one workbook from a single upload: one PDF with a bookmark per report (format=pdf),
+    # or a ZIP with the separate PDFs (format=zip). Reports without data are left out and listed
+    # in the Failed-Reports header (and in greske.txt inside the ZIP).
+    if 'excel_file' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+
+    file = request.files['excel_file']
+    if file.filename == '':
+        return jsonify({'error': 'Fajl nije selektovan'}), 400
+
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'Neispravan format fajla. Učitajte Excel fajl'}), 400
+
+    output_format = request.form.get('format', 'pdf')
+    if output_format not in ALL_REPORTS_FORMATS:
+        return jsonify({'error': 'Nepoznat format, dozvoljeni su pdf i zip'}), 400
+
+    filename = file.filename
+    filepath = os.path.join(UPLOAD_FOLDER, filename)
+    data = read_upload(file, filepath)
+    progress.publish(progress_id, 'upload', 'Fajl je učitan.')
+    data_hash = content_hash(data)
+    selected_sheet = request.form.get('selected_sheet') or None
+
+    try:
+        import reports
+
+        # Each report is cached on its own (shared with /generate/<report_type>), the combined PDF as a whole
+        report_keys = {report_type: pdf_cache.make_key(data_hash, report_type, selected_sheet if report_type == 'izvestaj' else None)
+                       for report_type in reports.REPORT_TITLES}
+        combined_key = pdf_cache.make_key(data_hash, 'sve', selected_sheet)
+        cached_pdfs = {}
+        if output_format == 'pdf':
+            cached = pdf_cache.get(combined_key)
+            if cached:
+                progress.publish(progress_id, 'cached', 'PDF je već generisan, preuzimanje...')
+                return all_reports_response(output_format, cached[0], cached[1]['professor_name'], cached[1]['failed'])
         else:
-            return jsonify({'error': 'Nepoznat tip izveštaja'}), 400
+            for report_type, cache_key in report_keys.items():
+                cached = pdf_cache.get(cache_key)
+                if cached:
+                    cached_pdfs[report_type] = cached
+
+        # The workbook is opened once, every report is extracted from it
+        extracted = {}
+        failed = []
+        missing = [report_type for report_type in reports.REPORT_TITLES if report_type not in cached_pdfs]
+        if missing:
+            for report_type, (report_data, professor_name) in load_reports(data, missing, selected_sheet).items():
+                if report_data:
+                    extracted[report_type] = (report_data, professor_name or '')
+                else:
+                    failed.append(report_type)
+            progress.publish(progress_id, 'parsed', 'Excel fajl je obrađen, generisanje PDF-a...')
 
+        professor_names = [meta['professor_name'] for _, meta in cached_pdfs.values()] + [name for _, name in extracted.values()]
+        professor_name = next((name for name in professor_names if name), '')
+        if not cached_pdfs and not extracted:
+            return jsonify({'error': 'Greška u obradi podataka, nijedan izveštaj nije generisan'}), 500
+
+        if output_format == 'pdf':
+            pdf_bytes = reports.render_combined([(report_type, *extracted[report_type])
+                                                 for report_type in reports.REPORT_TITLES if report_type in extracted])
+            pdf_cache.put(combined_key, pdf_bytes, {'professor_name': professor_name, 'failed': failed})
+            return all_reports_response(output_format, pdf_bytes, professor_name, failed)
+
+        # The separate PDFs are rendered at the same time in the batch worker processes
+        futures = {report_type: get_batch_pool().submit(reports.render_report, report_type, report_data, name)
+                   for report_type, (report_data, name) in extracted.items()}
+        zip_buffer = io.BytesIO()
+        errors = []
+        with ZipFile(zip_buffer, 'w', compression=ZIP_STORED) as zipf:
+            for report_type in reports.REPORT_TITLES:
+                if report_type in cached_pdfs:
+                    zipf.writestr(REPORT_DOWNLOAD_NAMES[report_type], cached_pdfs[report_type][0])
+                elif report_type in futures:
+                    try:
+                        pdf_bytes = futures[report_type].result()
+                    except BrokenProcessPool as e:
+                        reset_batch_pool()
+                        errors.append(f"{reports.REPORT_TITLES[report_type]}: {str(e)}")
+                        failed.append(report_type)
+                        continue
+                    except Exception as e:
+                        print(f"Error generating {report_type} PDF: {str(e)}")
+                        errors.append(f"{reports.REPORT_TITLES[report_type]}: {str(e)}")
+                        failed.append(report_type)
+                        continue
+                    pdf_cache.put(report_keys[report_type], pdf_bytes, {'professor_name': extracted[report_type][1]})
+                    zipf.writestr(REPORT_DOWNLOAD_NAMES[report_type], pdf_bytes)
+                    progress.publish(progress_id, 'rendered', f'Generisan izveštaj: {reports.REPORT_TITLES[report_type]}')
+                else:
+                    errors.append(f"{reports.REPORT_TITLES[report_type]}: nema podataka u Excel fajlu")
+            if errors:
+                zipf.writestr("greske.txt", "\n".join(errors))
+        return all_reports_response(output_format, zip_buffer.getvalue(), professor_name, failed)
     except Exception as e:
+        traceback.print_exc()
         return jsonify({'error': f'Neuspelo procesiranje fajla: {str(e)}'}), 500
 
+def all_reports_response(output_format, content, professor_name, failed):
+    if output_format == 'pdf':
+        response = send_file(io.BytesIO(content), as_attachment=True, download_name="svi_izvestaji.pdf", mimetype="application/pdf")
+    else:
+        response = send_file(io.BytesIO(content), as_attachment=True, download_name="svi_izvestaji.zip", mimetype="application/zip")
+    response.headers['Professor-Name'] = base64.b64encode(professor_name.encode('utf-8')).decode('ascii')
+    if failed:
+        response.headers['Failed-Reports'] = ','.join(failed)
+    return response
+
 @app.route('/procesiranje', methods=['POST'])
 def procesiranje():
+    progress_id = request.form.get('progress_id')
+    try:
+        return build_opterecenje(progress_id)
+    finally:
+        progress.close(progress_id)
+
+def build_opterecenje(progress_id):
     if 'excel_file' not in request.files or 'professor_name' not in request.form:
         return jsonify({'error': 'Excel fajl i ime profesora su obavezni.'}), 400
     file = request.files['excel_file']
     professor_name = request.form['professor_name']
     filename = file.filename
     filepath = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(filepath)
+    data = read_upload(file, filepath)
+    progress.publish(progress_id, 'upload', 'Fajl je učitan.')
     try:
-        df = pd.read_excel(filepath)
-        professor_data = df[df['Ime Predavača'] == professor_name]
-        if professor_data.empty:
-            return jsonify({'error': f'Nisu pronađeni podaci o profesoru sa imenom: {professor_name}'}), 404
-        columns_to_send = [
-            "Ime Predavača",
-            "Naziv Predmeta",
-            "Pozicija",
-            "Tip Predavanja",
-            "Nedeljni Broj Časova",
-            "Broj Grupa",
-            "Tip studija",
-            "Odsek",
-            "Ukupno casova"
-        ]
-        professor_data_filtered = professor_data[columns_to_send]
+        cache_key = pdf_cache.make_key(content_hash(data), 'opterecenje', professor_name)
+        cached = pdf_cache.get(cache_key)
+        if cached:
+            pdf_bytes = cached[0]
+        else:
+            from generatorpdfkonacno import generate_pdf_bytes
+
+            professors = load_department(data)
+            if professors is None:
+                return jsonify({'error': "Excel fajl mora da sadrži 'Ime Predavača' kolonu."}), 400
+            professor_data_filtered = professors.get(professor_name)
+            if professor_data_filtered is None:
+                return jsonify({'error': f'Nisu pronađeni podaci o profesoru sa imenom: {professor_name}'}), 404
+            progress.publish(progress_id, 'parsed', 'Excel fajl je obrađen, generisanje PDF-a...')
+            pdf_bytes = generate_pdf_bytes(professor_data_filtered)
+            pdf_cache.put(cache_key, pdf_bytes)
         pdf_name = f"{professor_name.replace(' ', '_')}_{datetime.now().strftime('Opterecenje_%Y%m%d_%H%M%S')}.pdf"
         pdf_path = os.path.join(PDF_FOLDER, pdf_name)
-        generate_pdf(professor_data_filtered, pdf_path)
+        # A copy of every generated PDF is kept in pdfs/
+        with open(pdf_path, 'wb') as f:
+            f.write(pdf_bytes)
         return send_file(pdf_path, as_attachment=True, download_name=pdf_name, mimetype="application/pdf")
     except Exception as e:
         return jsonify({'error': f'Greška u procesiranju: {str(e)}'}), 500
 
+def plan_department_batch(data, data_hash):
+    # Starts rendering the Opterećenje PDF of every professor in the department workbook.
+    # Returns (jobs, None) with jobs = [(professor_name, pdf_name, pdf bytes or Future)], or (None, (error, status)).
+    # The professor list of this workbook is cached too, so when every PDF is cached
+    # the department sheet isn't parsed at all
+    list_key = pdf_cache.make_key(data_hash, 'opterecenje_svi')
+    cached_list = pdf_cache.get(list_key)
+    professor_names = cached_list[1]['professors'] if cached_list else None
+    cached_pdfs = {}
+    if professor_names is not None:
+        for professor_name in professor_names:
+            cached = pdf_cache.get(pdf_cache.make_key(data_hash, 'opterecenje', professor_name))
+            if cached:
+                cached_pdfs[professor_name] = cached[0]
+
+    professors = {}
+    if professor_names is None or len(cached_pdfs) < len(professor_names):
+        professors = load_department(data)
+        if professors is None:
+            return None, ("Excel fajl mora da sadrži 'Ime Predavača' kolonu.", 400)
+        if not professors:
+            return None, ('Nije generisan nijedan PDF. Proverite učitane podatke.', 400)
+        professor_names = list(professors)
+        pdf_cache.put(list_key, b'', {'professors': professor_names})
+
+    jobs = []
+    for professor_name in professor_names:
+        pdf_name = f"{professor_name.replace(' ', '_')}_{datetime.now().strftime('Opterecenje_%Y%m%d_%H%M%S')}.pdf"
+        if professor_name in cached_pdfs:
+            jobs.append((professor_name, pdf_name, cached_pdfs[professor_name]))
+        else:
+            from generatorpdfkonacno import generate_pdf_bytes
+            jobs.append((professor_name, pdf_name, get_batch_pool().submit(generate_pdf_bytes, professors[professor_name])))
+    return jobs, None
+
+def write_batch_zip(zipf, jobs, data_hash):
+    # Entries are written in submission order so the layout is always the same, with greske.txt
+    # at the end if some PDFs failed. Yields (professor_name, error or None) after every entry.
+    failures = []
+    for professor_name, pdf_name, job in jobs:
+        error = None
+        try:
+            if isinstance(job, bytes):
+                pdf_bytes = job
+            else:
+                pdf_bytes = job.result()
+                pdf_cache.put(pdf_cache.make_key(data_hash, 'opterecenje', professor_name), pdf_bytes)
+            zipf.writestr(pdf_name, pdf_bytes)
+        except BrokenProcessPool as e:
+            reset_batch_pool()
+            error = str(e)
+        except Exception as e:
+            print(f"Error generating PDF for {professor_name}: {str(e)}")
+            error = str(e)
+        if error:
+            failures.append(f"{professor_name}: {error}")
+        yield professor_name, error
+    if failures:
+        zipf.writestr("greske.txt", "\n".join(failures))
+
 @app.route('/procesiranjesvih', methods=['POST'])
 def procesiranjesvih():
     if 'excel_file_svih' not in request.files:
@@ -196,43 +633,350 @@ def procesiranjesvih():
     file = request.files['excel_file_svih']
     filename = file.filename
     filepath = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(filepath)
+    data = read_upload(file, filepath)
+    progress_id = request.form.get('progress_id')
+    progress.publish(progress_id, 'upload', 'Fajl je učitan.')
+    data_hash = content_hash(data)
     try:
-        df = pd.read_excel(filepath)
-        if 'Ime Predavača' not in df.columns:
-            return jsonify({'error': "Excel fajl mora da sadrži 'Ime Predavača' kolonu."}), 400
-        unique_professors = df['Ime Predavača'].dropna().unique()
-        pdf_files = []
-        for professor_name in unique_professors:
-            professor_data = df[df['Ime Predavača'] == professor_name]
-            if not professor_data.empty:
-                columns_to_send = [
-                    "Ime Predavača",
-                    "Naziv Predmeta",
-                    "Pozicija",
-                    "Tip Predavanja",
-                    "Nedeljni Broj Časova",
-                    "Broj Grupa",
-                    "Tip studija",
-                    "Odsek",
-                    "Ukupno casova"
-                ]
-                professor_data_filtered = professor_data[columns_to_send]
-                pdf_name = f"{professor_name.replace(' ', '_')}_{datetime.now().strftime('Opterecenje_%Y%m%d_%H%M%S')}.pdf"
-                pdf_path = os.path.join(PDF_FOLDER, pdf_name)
-                generate_pdf(professor_data_filtered, pdf_path)
-                pdf_files.append(pdf_name)
-        if not pdf_files:
-            return jsonify({'error': 'Nije generisan nijedan PDF. Proverite učitane podatke.'}), 400
-        zip_filename = f"professors_pdfs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
-        zip_filepath = os.path.join(PDF_FOLDER, zip_filename)
-        with ZipFile(zip_filepath, 'w') as zipf:
-            for pdf_file in pdf_files:
-                zipf.write(os.path.join(PDF_FOLDER, pdf_file), pdf_file)
-        return send_file(zip_filepath, as_attachment=True, download_name=zip_filename, mimetype="application/zip")
+        jobs, error = plan_department_batch(data, data_hash)
+        if error:
+            progress.close(progress_id, error[0])
+            return jsonify({'error': error[0]}), error[1]
     except Exception as e:
+        progress.close(progress_id, str(e))
         return jsonify({'error': f'Greška u procesiranju svih: {str(e)}'}), 500
+    progress.publish(progress_id, 'parsed', f'Pronađeno {len(jobs)} nastavnika.', done=0, total=len(jobs))
+
+    def generate_zip():
+        # The archive is streamed while the PDFs are still being rendered.
+        # PDFs are already compressed, so they are stored.
+        stream = ZipStream()
+        try:
+            with ZipFile(stream, 'w', compression=ZIP_STORED) as zipf:
+                for done, _ in enumerate(write_batch_zip(zipf, jobs, data_hash), 1):
+                    progress.publish(progress_id, 'rendered', f'Generisano {done} od {len(jobs)} PDF-ova...', done=done, total=len(jobs))
+                    yield stream.pop()
+            progress.publish(progress_id, 'finalized', 'ZIP je završen.')
+            yield stream.pop()
+        finally:
+            progress.close(progress_id)
+
+    zip_filename = f"professors_pdfs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return Response(
+        stream_with_context(generate_zip()),
+        mimetype="application/zip",
+        headers={'Content-Disposition': f'attachment; filename={zip_filename}'}
+    )
+
+def remove_expired_jobs():
+    # Finished jobs (and their archives) are kept for BATCH_JOB_TTL seconds
+    now = time.time()
+    with batch_jobs_lock:
+        expired = [job_id for job_id, job in batch_jobs.items()
+                   if job['status'] in ('done', 'error') and now - job['finished'] > BATCH_JOB_TTL]
+        for job_id in expired:
+            del batch_jobs[job_id]
+    for job_id in expired:
+        try:
+            os.remove(os.path.join(BATCH_JOBS_FOLDER, f"{job_id}.zip"))
+        except OSError:
+            pass
+    sweep_jobs_folder(now)
+
+def sweep_jobs_folder(now=None):
+    # Archives left by an earlier run of the server (and .tmp files of jobs that never finished) aren't in
+    # batch_jobs, they are removed once they are older than BATCH_JOB_TTL. Files of running jobs are kept.
+    now = now or time.time()
+    with batch_jobs_lock:
+        active = {job_id for job_id, job in batch_jobs.items() if job['status'] not in ('done', 'error')}
+    try:
+        entries = list(os.scandir(BATCH_JOBS_FOLDER))
+    except OSError:
+        return
+    for entry in entries:
+        if not entry.name.endswith(('.zip', '.tmp')) or entry.name.split('.', 1)[0] in active:
+            continue
+        try:
+            if now - entry.stat().st_mtime > BATCH_JOB_TTL:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+def create_job(zip_name, failures=None):
+    remove_expired_jobs()
+    job_id = uuid.uuid4().hex
+    with batch_jobs_lock:
+        batch_jobs[job_id] = {
+            'status': 'queued',
+            'done': 0,
+            'total': None,
+            'failures': list(failures or []),
+            'error': None,
+            'zip_name': zip_name,
+            'finished': None,
+        }
+    return job_id
+
+def update_job(job_id, **fields):
+    with batch_jobs_lock:
+        batch_jobs[job_id].update(fields)
+
+@metrics.timed('job', 'opterecenje_svi')
+def run_batch_job(job_id, data):
+    # Runs on a job_runner thread: renders the department batch and writes the archive to BATCH_JOBS_FOLDER
+    zip_path = os.path.join(BATCH_JOBS_FOLDER, f"{job_id}.zip")
+    # Progress is also published as server-sent events on /progress/<job_id>
+    try:
+        update_job(job_id, status='running')
+        data_hash = content_hash(data)
+        jobs, error = plan_department_batch(data, data_hash)
+        if error:
+            update_job(job_id, status='error', error=error[0], finished=time.time())
+            progress.close(job_id, error[0])
+            return
+        update_job(job_id, total=len(jobs))
+        progress.publish(job_id, 'parsed', f'Pronađeno {len(jobs)} nastavnika.', done=0, total=len(jobs))
+        with ZipFile(zip_path + '.tmp', 'w', compression=ZIP_STORED) as zipf:
+            for professor_name, error in write_batch_zip(zipf, jobs, data_hash):
+                with batch_jobs_lock:
+                    batch_jobs[job_id]['done'] += 1
+                    done = batch_jobs[job_id]['done']
+                    if error:
+                        batch_jobs[job_id]['failures'].append(f"{professor_name}: {error}")
+                progress.publish(job_id, 'rendered', f'Generisano {done} od {len(jobs)} PDF-ova...', done=done, total=len(jobs))
+        os.replace(zip_path + '.tmp', zip_path)
+        update_job(job_id, status='done', finished=time.time())
+        progress.publish(job_id, 'finalized', 'ZIP je završen.')
+        progress.close(job_id)
+    except Exception as e:
+        traceback.print_exc()
+        update_job(job_id, status='error', error=f'Greška u procesiranju svih: {str(e)}', finished=time.time())
+        progress.close(job_id, str(e))
+
+@app.route('/procesiranjesvih/jobs', methods=['POST'])
+def create_batch_job():
+    # Same as /procesiranjesvih, but the request returns right away with a job id.
+    # Progress is read from /procesiranjesvih/jobs/<job_id>, the archive from .../download.
+    if 'excel_file_svih' not in request.files:
+        return jsonify({'error': 'Excel fajl je obavezan.'}), 400
+    file = request.files['excel_file_svih']
+    filename = file.filename
+    filepath = os.path.join(UPLOAD_FOLDER, filename)
+    data = read_upload(file, filepath)
+
+    job_id = create_job(f"professors_pdfs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
+    progress.publish(job_id, 'upload', 'Fajl je učitan.')
+    job_runner.submit(run_batch_job, job_id, data)
+    return jsonify({
+        'job_id': job_id,
+        'status_url': f'/procesiranjesvih/jobs/{job_id}',
+        'events_url': f'/progress/{job_id}',
+        'download_url': f'/procesiranjesvih/jobs/{job_id}/download',
+    }), 202
+
+@app.route('/procesiranjesvih/jobs/<job_id>', methods=['GET'])
+@app.route('/jobs/<job_id>', methods=['GET'])
+def batch_job_status(job_id):
+    with batch_jobs_lock:
+        job = batch_jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Nepoznat posao.'}), 404
+        return jsonify({
+            'status': job['status'],
+            'done': job['done'],
+            'total': job['total'],
+            'failures': list(job['failures']),
+            'error': job['error'],
+        })
+
+@app.route('/procesiranjesvih/jobs/<job_id>/download', methods=['GET'])
+@app.route('/jobs/<job_id>/download', methods=['GET'])
+def batch_job_download(job_id):
+    with batch_jobs_lock:
+        job = batch_jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Nepoznat posao.'}), 404
+        if job['status'] != 'done':
+            return jsonify({'error': 'ZIP još nije spreman.'}), 409
+        zip_name = job['zip_name']
+    return send_file(os.path.join(BATCH_JOBS_FOLDER, f"{job_id}.zip"), as_attachment=True, download_name=zip_name, mimetype="application/zip")
+
+def collect_bulk_workbooks(files):
+    # The Excel files of a bulk upload, ZIP archives are opened and the Excel files inside are taken.
+    # Returns ([(file_name, bytes)], [error lines for greske.txt]). Raises BulkUploadTooLarge as soon as
+    # the limits are exceeded: ZIP members are checked by their declared size before they are unpacked
+    # (ZipFile never unpacks more than that), so an archive can't fill the memory first.
+    workbooks = []
+    errors = []
+    total_size = 0
+
+    def add(name, size, read):
+        nonlocal total_size
+        if len(workbooks) >= BULK_MAX_WORKBOOKS:
+            raise BulkUploadTooLarge(f'Najviše {BULK_MAX_WORKBOOKS} Excel fajlova odjednom.')
+        if size > BULK_MAX_FILE_BYTES:
+            raise BulkUploadTooLarge(f'{name}: Excel fajl je veći od {BULK_MAX_FILE_BYTES // (1024 * 1024)} MB.')
+        total_size += size
+        if total_size > BULK_MAX_TOTAL_BYTES:
+            raise BulkUploadTooLarge(f'Excel fajlovi su ukupno veći od {BULK_MAX_TOTAL_BYTES // (1024 * 1024)} MB.')
+        workbooks.append((name, read()))
+
+    for file in files:
+        if file.filename == '':
+            continue
+        if file.filename.lower().endswith('.zip'):
+            try:
+                with ZipFile(file.stream) as archive:
+                    for info in archive.infolist():
+                        base_name = os.path.basename(info.filename)
+                        # Folders, macOS metadata and Excel lock files
+                        if info.is_dir() or info.filename.startswith('__MACOSX/') or base_name.startswith(('.', '~$')):
+                            continue
+                        if allowed_file(base_name):
+                            add(base_name, info.file_size, lambda: archive.read(info))
+                        else:
+                            errors.append(f"{file.filename}/{info.filename}: nije Excel fajl")
+            except BadZipFile:
+                errors.append(f"{file.filename}: neispravan ZIP fajl")
+        elif allowed_file(file.filename):
+            file.stream.seek(0, os.SEEK_END)
+            size = file.stream.tell()
+            file.stream.seek(0)
+            add(file.filename, size, file.read)
+        else:
+            errors.append(f"{file.filename}: nije Excel fajl")
+    return workbooks, errors
+
+def bulk_folder_name(name, used_names):
+    # One folder per teacher in the bulk archive; two workbooks of the same teacher get name, name_2, ...
+    folder = name.replace('/', '_').replace('\\', '_').replace(' ', '_').strip('._') or 'nastavnik'
+    candidate = folder
+    suffix = 2
+    while candidate.lower() in used_names:
+        candidate = f"{folder}_{suffix}"
+        suffix += 1
+    used_names.add(candidate.lower())
+    return candidate
+
+@metrics.timed('job', 'bulk')
+def run_bulk_job(job_id, workbooks, report_types, selected_sheet):
+    # Runs on a job_runner thread. Every workbook is one batch_pool task that parses it and renders
+    # its reports; the archive has a folder per teacher and greske.txt with everything that failed.
+    import reports
+
+    zip_path = os.path.join(BATCH_JOBS_FOLDER, f"{job_id}.zip")
+    try:
+        update_job(job_id, status='running', total=len(workbooks))
+        progress.publish(job_id, 'parsed', f'Primljeno {len(workbooks)} Excel fajlova.', done=0, total=len(workbooks))
+        jobs = []
+        for file_name, data in workbooks:
+            data_hash = content_hash(data)
+            cache_keys = {report_type: pdf_cache.make_key(data_hash, report_type, selected_sheet if report_type == 'izvestaj' else None)
+                          for report_type in report_types}
+            cached = {report_type: pdf_cache.get(cache_key) for report_type, cache_key in cache_keys.items()}
+            if all(cached.values()):
+                # Everything of this workbook was generated before, it isn't parsed again
+                professor_name = next(iter(cached.values()))[1]['professor_name']
+                jobs.append((file_name, cache_keys, (professor_name, {report_type: entry[0] for report_type, entry in cached.items()}, {})))
+            else:
+                jobs.append((file_name, cache_keys, get_batch_pool().submit(reports.render_workbook, data, report_types, selected_sheet)))
+
+        used_names = set()
+        with ZipFile(zip_path + '.tmp', 'w', compression=ZIP_STORED) as zipf:
+            for file_name, cache_keys, job in jobs:
+                failures = []
+                try:
+                    if isinstance(job, tuple):
+                        professor_name, pdfs, errors = job
+                    else:
+                        professor_name, pdfs, errors = job.result()
+                        for report_type, pdf_bytes in pdfs.items():
+                            pdf_cache.put(cache_keys[report_type], pdf_bytes, {'professor_name': professor_name})
+                    if pdfs:
+                        folder = bulk_folder_name(professor_name or os.path.splitext(file_name)[0], used_names)
+                        for report_type, pdf_bytes in pdfs.items():
+                            zipf.writestr(f"{folder}/{REPORT_DOWNLOAD_NAMES[report_type]}", pdf_bytes)
+                    failures = [f"{file_name}: {reports.REPORT_TITLES[report_type]}: {error}" for report_type, error in errors.items()]
+                except BrokenProcessPool as e:
+                    reset_batch_pool()
+                    failures = [f"{file_name}: {str(e)}"]
+                except Exception as e:
+                    print(f"Error generating PDFs for {file_name}: {str(e)}")
+                    failures = [f"{file_name}: {str(e)}"]
+                with batch_jobs_lock:
+                    batch_jobs[job_id]['done'] += 1
+                    batch_jobs[job_id]['failures'].extend(failures)
+                    done = batch_jobs[job_id]['done']
+                progress.publish(job_id, 'rendered', f'Obrađeno {done} od {len(jobs)} Excel fajlova...', done=done, total=len(jobs))
+            with batch_jobs_lock:
+                failures = list(batch_jobs[job_id]['failures'])
+            if failures:
+                zipf.writestr("greske.txt", "\n".join(failures))
+        os.replace(zip_path + '.tmp', zip_path)
+        update_job(job_id, status='done', finished=time.time())
+        progress.publish(job_id, 'finalized', 'ZIP je završen.')
+        progress.close(job_id)
+    except Exception as e:
+        traceback.print_exc()
+        update_job(job_id, status='error', error=f'Greška u procesiranju: {str(e)}', finished=time.time())
+        progress.close(job_id, str(e))
+
+@app.route('/generate_bulk', methods=['POST'])
+def create_bulk_job():
+    # Many teachers' workbooks at once (excel_files, each an Excel file or a ZIP of them). Works like
+    # /procesiranjesvih/jobs: returns a job id right away, the archive is downloaded when the job is done.
+    files = request.files.getlist('excel_files')
+    if not any(file.filename for file in files):
+        return jsonify({'error': 'Excel fajlovi su obavezni.'}), 400
+
+    report_types = request.form.getlist('report_types') or list(REPORT_DOWNLOAD_NAMES)
+    if any(report_type not in REPORT_DOWNLOAD_NAMES for report_type in report_types):
+        return jsonify({'error': 'Nepoznat tip izveštaja'}), 400
+    selected_sheet = request.form.get('selected_sheet') or None
+
+    # The workbooks are only kept in memory for the job, they are not copied to uploads/
+    try:
+        workbooks, upload_errors = collect_bulk_workbooks(files)
+    except BulkUploadTooLarge as e:
+        return jsonify({'error': str(e)}), 400
+    if not workbooks:
+        return jsonify({'error': 'Nije pronađen nijedan Excel fajl.'}), 400
+
+    job_id = create_job(f"izvestaji_nastavnika_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip", upload_errors)
+    progress.publish(job_id, 'upload', f'Učitano {len(workbooks)} Excel fajlova.')
+    job_runner.submit(run_bulk_job, job_id, workbooks, report_types, selected_sheet)
+    return jsonify({
+        'job_id': job_id,
+        'status_url': f'/jobs/{job_id}',
+        'events_url': f'/progress/{job_id}',
+        'download_url': f'/jobs/{job_id}/download',
+    }), 202
+
+def log_startup_time(listening_time, warm_time):
+    line = f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} listening={listening_time:.3f}s warm={warm_time:.3f}s"
+    print(f"Startup: {line}")
+    try:
+        with open(STARTUP_LOG, 'a', encoding='utf-8') as log:
+            log.write(line + "\n")
+    except OSError as e:
+        print(f"Could not write startup log: {e}")
+
+def warm_up(listening_time):
+    # Import the report modules and load the fonts in the background so the first request doesn't pay for it
+    try:
+        for module_name in REPORT_MODULES:
+            importlib.import_module(module_name)
+        importlib.import_module("pdf_styles").warm_up()
+    except Exception:
+        traceback.print_exc()
+    log_startup_time(listening_time, time.perf_counter() - STARTUP_START)
 
 if __name__ == "__main__": 
     #app.run(debug=True, port=1000)
-    serve(app, host='0.0.0.0', port=80)
\ No newline at end of file
+    # Progress streams (/progress/<id>) keep a thread busy while their request runs
+    sweep_jobs_folder()
+    server = create_server(app, host='0.0.0.0', port=80, threads=WAITRESS_THREADS)
+    listening_time = time.perf_counter() - STARTUP_START
+    print(f"Server listening on port 80 after {listening_time:.3f}s")
+    threading.Thread(target=warm_up, args=(listening_time,), daemon=True).start()
+    server.run()
@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import argparse
+import platform
+import time
+import threading
+import subprocess
+import tempfile
+import contextlib
+from datetime import datetime
+from zipfile import ZipFile, ZIP_STORED
+
+# Peak memory of a /procesiranjesvih run (department workbook parsed, an Opterećenje PDF rendered for every
+# professor in batch_pool and streamed into a ZIP) at several multiples of the real department size. Every
+# run is a fresh process with its own pool, so the peaks are the peaks of that run alone: peak_rss_mb of the
+# process that runs the app code, peak_tree_rss_mb of it and its pool workers together. Runs offline:
+#   python benchmarks/memory_benchmarks.py                       fails if a threshold is exceeded
+#   python benchmarks/memory_benchmarks.py --update-thresholds   after an intended change in memory use
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+THRESHOLDS_FILE = os.path.join(ROOT, 'benchmarks', 'memory_thresholds.json')
+RESULTS_FOLDER = os.path.join(ROOT, 'benchmarks', 'results')
+sys.path.insert(0, ROOT)
+
+# "Odsek Nis 2024-2025": 57 professors, 553 rows
+DEPARTMENT_PROFESSORS = 57
+ROWS_PER_PROFESSOR = 10
+DEFAULT_SCALES = [1, 5, 20]
+# batch_pool size of the runs (app.BATCH_WORKERS); fixed, so the thresholds don't depend on the machine
+DEFAULT_WORKERS = 4
+# How often the RSS of the process tree is sampled
+SAMPLE_SECONDS = 0.02
+# New thresholds are the measured values with this much headroom
+THRESHOLD_MARGIN = 1.25
+TOP_ALLOCATORS = 10
+# tracemalloc only sees the process that runs the app code (the PDFs are rendered in the pool workers):
+# the parsed department and the rendered PDFs waiting to be written to the ZIP. It slows the run down,
+# so only the parse and the first PDFs are traced.
+TRACED_PDFS = 10
+
+def peak_rss_mb():
+    # Peak resident set size of this process so far; None where the resource module is missing (Windows).
+    # On Linux VmHWM is used: ru_maxrss is carried over from the parent through fork and exec, so it
+    # would report the benchmark process that generated the workbook.
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+def tree_rss_mb(pid):
+    # RSS of pid and all its descendants, summed (shared pages are counted in every process).
+    # Read from /proc, so None where there is no /proc (Windows, macOS).
+    if not os.path.isdir('/proc'):
+        return None
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat', 'rb') as f:
+                    # The command name can contain spaces, the fields after it can't
+                    parents[int(entry)] = int(f.read().rsplit(b')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                pass
+    tree = {pid}
+    added = True
+    while added:
+        added = False
+        for child, parent in parents.items():
+            if parent in tree and child not in tree:
+                tree.add(child)
+                added = True
+    total = 0
+    for process in tree:
+        try:
+            with open(f'/proc/{process}/statm') as f:
+                total += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, IndexError, ValueError):
+            pass
+    return total / 1024 / 1024
+
+def run_department(path, trace):
+    # What app.procesiranjesvih does: the workbook split by professor (app.load_department), every PDF
+    # submitted to batch_pool (app.plan_department_batch), and the results written to a streamed ZIP in
+    # submission order (app.write_batch_zip)
+    with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+        import tracemalloc
+        import importlib
+        import app
+        import pdf_styles
+        # Modules app imports on first use are imported here, so they don't count as allocations of the run
+        for module in ['pandas', 'openpyxl', 'pandas.io.excel._openpyxl', 'generatorpdfkonacno']:
+            importlib.import_module(module)
+        pdf_styles.register_fonts()
+
+        result = {'rss_after_imports_mb': peak_rss_mb(), 'workers': app.BATCH_WORKERS}
+        if trace:
+            tracemalloc.start()
+        with open(path, 'rb') as f:
+            data = f.read()
+        data_hash = app.content_hash(data)
+        jobs, error = app.plan_department_batch(data, data_hash)
+        if error:
+            raise RuntimeError(error[0])
+        if trace:
+            # Everything the parsed department holds on to
+            snapshot = tracemalloc.take_snapshot()
+        stream = app.ZipStream()
+        zip_bytes = 0
+        failures = 0
+        with ZipFile(stream, 'w', compression=ZIP_STORED) as zipf:
+            for done, (_, error) in enumerate(app.write_batch_zip(zipf, jobs, data_hash), 1):
+                failures += error is not None
+                zip_bytes += len(stream.pop())
+                if trace and done == TRACED_PDFS:
+                    result['tracemalloc_peak_mb'] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+                    tracemalloc.stop()
+        zip_bytes += len(stream.pop())
+        app.get_batch_pool().shutdown()
+
+        result.update({'professors': len(jobs), 'failures': failures, 'zip_mb': zip_bytes / 1024 / 1024,
+                       'peak_rss_mb': peak_rss_mb()})
+        if trace:
+            if tracemalloc.is_tracing():
+                result['tracemalloc_peak_mb'] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+                tracemalloc.stop()
+            result['top_allocators'] = [
+                {'where': str(stat.traceback[0]), 'size_mb': stat.size / 1024 / 1024, 'count': stat.count}
+                for stat in snapshot.filter_traces([
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+                ]).statistics('lineno')[:TOP_ALLOCATORS]
+            ]
+    return result
+
+def measure(path, trace, workers):
+    # One run in a child process started in an empty folder (app creates uploads/, pdfs/ and pdf_cache/
+    # where it runs). The RSS of the child and its pool workers is sampled while it runs.
+    with tempfile.TemporaryDirectory() as folder:
+        command = [sys.executable, os.path.abspath(__file__), '--child', path] + (['--trace'] if trace else [])
+        env = dict(os.environ, BATCH_WORKERS=str(workers))
+        child = subprocess.Popen(command, cwd=folder, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                 text=True, encoding='utf-8')
+        peak_tree = [None]
+
+        def sample():
+            while child.poll() is None:
+                rss = tree_rss_mb(child.pid)
+                if rss is not None and (peak_tree[0] is None or rss > peak_tree[0]):
+                    peak_tree[0] = rss
+                time.sleep(SAMPLE_SECONDS)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        stdout, stderr = child.communicate()
+        sampler.join()
+    if child.returncode != 0:
+        raise RuntimeError(f"Memory run failed:\n{stderr}")
+    result = json.loads(stdout.strip().splitlines()[-1])
+    result['peak_tree_rss_mb'] = peak_tree[0]
+    return result
+
+def check_thresholds(results, thresholds):
+    # Returns the list of exceeded thresholds
+    exceeded = []
+    for scale, result in results.items():
+        for metric, limit in thresholds.get(scale, {}).items():
+            value = result.get(metric)
+            if value is not None and value > limit:
+                exceeded.append(f"{scale}x {metric}: {value:.1f} MB > {limit:.1f} MB")
+    return exceeded
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of department batch runs at several department sizes")
+    parser.add_argument('--scales', default=','.join(str(scale) for scale in DEFAULT_SCALES),
+                        help="multiples of the department size, comma separated")
+    parser.add_argument('--hidden-rows', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="batch_pool worker processes")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-trace', action='store_true', help="skip the tracemalloc runs (peak RSS only)")
+    parser.add_argument('--thresholds', default=THRESHOLDS_FILE)
+    parser.add_argument('--update-thresholds', action='store_true',
+                        help=f"write the measured values (x{THRESHOLD_MARGIN}) as the new thresholds")
+    parser.add_argument('--output', help="JSON file for the results (default: benchmarks/results/memory-<time>.json)")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--trace', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_department(args.child, args.trace)))
+        return
+
+    from benchmarks.synthetic_workbooks import make_department_workbook
+
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for scale in [int(scale) for scale in args.scales.split(',')]:
+            path = make_department_workbook(os.path.join(folder, f'odsek_{scale}x.xlsx'),
+                                            professors=DEPARTMENT_PROFESSORS * scale, rows_per_professor=ROWS_PER_PROFESSOR,
+                                            hidden_rows=args.hidden_rows * scale, seed=args.seed)
+            # RSS is measured without tracemalloc, which needs a lot of memory of its own
+            result = measure(path, trace=False, workers=args.workers)
+            result['workbook_mb'] = os.path.getsize(path) / 1024 / 1024
+            if not args.no_trace:
+                traced = measure(path, trace=True, workers=args.workers)
+                result['tracemalloc_peak_mb'] = traced['tracemalloc_peak_mb']
+                result['top_allocators'] = traced['top_allocators']
+            results[str(scale)] = result
+
+            rss = result['peak_rss_mb']
+            tree_rss = result['peak_tree_rss_mb']
+            print(f"{scale:>3}x  {result['professors']:>5} professors  workbook {result['workbook_mb']:6.2f} MB  "
+                  f"peak RSS {rss if rss is None else f'{rss:7.1f} MB'}  (after imports {result['rss_after_imports_mb'] or 0:.1f} MB)  "
+                  f"with {result['workers']} workers {tree_rss if tree_rss is None else f'{tree_rss:7.1f} MB'}  "
+                  f"tracemalloc peak {result.get('tracemalloc_peak_mb', 0):7.1f} MB")
+            if result['failures']:
+                print(f"       {result['failures']} PDFs failed")
+            for allocator in result.get('top_allocators', [])[:5]:
+                print(f"       {allocator['size_mb']:7.2f} MB  {allocator['where']}")
+
+    output = args.output or os.path.join(RESULTS_FOLDER, f"memory-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.update_thresholds:
+        thresholds = {scale: {metric: round(result[metric] * THRESHOLD_MARGIN, 1)
+                              for metric in ['peak_rss_mb', 'peak_tree_rss_mb', 'tracemalloc_peak_mb'] if result.get(metric) is not None}
+                      for scale, result in results.items()}
+        with open(args.thresholds, 'w', encoding='utf-8') as f:
+            json.dump(thresholds, f, indent=2)
+            f.write("\n")
+        print(f"Thresholds written to {args.thresholds}")
+        return
+
+    with open(args.thresholds, encoding='utf-8') as f:
+        exceeded = check_thresholds(results, json.load(f))
+    if exceeded:
+        print("Memory thresholds exceeded:\n" + "\n".join(exceeded))
+        sys.exit(1)
+    print("All memory thresholds met.")
+
+if __name__ == '__main__':
+    main()
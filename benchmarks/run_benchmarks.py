@@ -0,0 +1,181 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import contextlib
+from datetime import datetime
+from importlib.metadata import version
+
+# Timed benchmarks of every parse and render path on synthetic workbooks. Runs offline; the results are
+# saved as JSON, so two commits can be compared:
+#   python benchmarks/run_benchmarks.py --rows 2000 --output before.json
+#   python benchmarks/run_benchmarks.py --rows 2000 --compare before.json
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FOLDER = os.path.join(ROOT, 'benchmarks', 'results')
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+from benchmarks.synthetic_workbooks import make_teacher_workbook, make_department_workbook
+import generate_pdf_testing_AN as an
+import generate_pdf_testing_EDN as edn
+import generate_pdf_izvestaj_o_radu_konacno as izvestaj
+import generate_pdf_testing_OP as op
+import generatorpdfkonacno
+import app
+
+def quiet():
+    # The report modules print a lot of debugging output
+    return contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8'))
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+def make_benchmarks(teacher_path, department_path):
+    # [(name, function)]. The render benchmarks get data extracted once here, so they time only the PDF.
+    with quiet():
+        an_data, professor_name = an.process_analiza_nastave(teacher_path)
+        edn_data, _ = edn.process_excel(teacher_path)
+        month_data, _, _ = izvestaj.process_excel(teacher_path)
+        year_data, _, _ = izvestaj.process_excel(teacher_path, izvestaj.ALL_MONTHS)
+        op_data = op.process_excel(teacher_path)
+        with open(department_path, 'rb') as f:
+            department_data = f.read()
+        # The per-professor frames /procesiranje and /procesiranjesvih render
+        professors = list(load_department_uncached(department_data).values())
+    if not (an_data and edn_data and month_data and year_data and op_data):
+        raise RuntimeError("A report could not be extracted from the synthetic workbook")
+
+    return [
+        ('process_analiza_nastave', lambda: an.process_analiza_nastave(teacher_path)),
+        ('edn.process_excel', lambda: edn.process_excel(teacher_path)),
+        ('izvestaj.process_excel', lambda: izvestaj.process_excel(teacher_path)),
+        ('izvestaj.process_excel[cela_godina]', lambda: izvestaj.process_excel(teacher_path, izvestaj.ALL_MONTHS)),
+        ('op.process_excel', lambda: op.process_excel(teacher_path)),
+        ('odsek.read_excel', lambda: pd.read_excel(department_path)),
+        # What a department upload costs: read, column projection and the split per professor
+        ('odsek.load_department', lambda: load_department_uncached(department_data)),
+        ('generate_pdf_an', lambda: an.generate_pdf_an(an_data, io.BytesIO(), professor_name)),
+        ('generate_pdf_edn', lambda: edn.generate_pdf_edn(edn_data, io.BytesIO(), professor_name)),
+        ('izvestaj.generate_pdf_testing_test1', lambda: izvestaj.generate_pdf_testing_test1(month_data, io.BytesIO(), professor_name)),
+        ('izvestaj.generate_pdf_testing_test1[cela_godina]', lambda: izvestaj.generate_pdf_testing_test1(year_data, io.BytesIO(), professor_name)),
+        ('op.generate_pdf_testing_test1', lambda: op.generate_pdf_testing_test1(op_data, io.BytesIO())),
+        ('generate_pdf', lambda: generatorpdfkonacno.generate_pdf(professors[0], io.BytesIO())),
+        # Every professor of the department one after another, like /procesiranjesvih with one worker
+        ('generate_pdf[odsek]', lambda: [generatorpdfkonacno.generate_pdf(group, io.BytesIO()) for group in professors]),
+        ('generate_pdf[odsek,platypus]', lambda: render_platypus(professors)),
+    ]
+
+def load_department_uncached(data):
+    # app.load_department without its cache, every call reads and partitions the workbook
+    with app.workbook_cache_lock:
+        app.workbook_cache.clear()
+    return app.load_department(data)
+
+def render_platypus(professors):
+    # generate_pdf[odsek] with the platypus renderer, to compare with the canvas one
+    renderer = generatorpdfkonacno.OPTERECENJE_RENDERER
+    generatorpdfkonacno.OPTERECENJE_RENDERER = 'platypus'
+    try:
+        return [generatorpdfkonacno.generate_pdf(group, io.BytesIO()) for group in professors]
+    finally:
+        generatorpdfkonacno.OPTERECENJE_RENDERER = renderer
+
+def run(function, repeat, warmup):
+    times = []
+    with quiet():
+        for i in range(warmup + repeat):
+            start = time.perf_counter()
+            function()
+            if i >= warmup:
+                times.append(time.perf_counter() - start)
+    return {
+        'runs': repeat,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+        'max': max(times),
+        'times': times,
+    }
+
+def compare(results, parameters, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    if baseline.get('parameters') != parameters:
+        print(f"Warning: different parameters, before {baseline.get('parameters')}")
+    print(f"{'benchmark':<50} {'before':>10} {'after':>10} {'ratio':>7}")
+    for name, result in results.items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:<50} {'-':>10} {result['median'] * 1000:>8.1f}ms")
+            continue
+        ratio = result['median'] / before['median'] if before['median'] else float('inf')
+        print(f"{name:<50} {before['median'] * 1000:>8.1f}ms {result['median'] * 1000:>8.1f}ms {ratio:>6.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the report parsers and PDF generators on synthetic workbooks")
+    parser.add_argument('--rows', type=int, default=300, help="Evidencija drzanja nastave rows")
+    parser.add_argument('--sheets', type=int, default=8, help="monthly sheets")
+    parser.add_argument('--subjects', type=int, default=8, help="subjects per month in Analiza nastave")
+    parser.add_argument('--activities', type=int, default=3, help="activities per section of a monthly sheet")
+    parser.add_argument('--professors', type=int, default=60, help="professors in the department workbook")
+    parser.add_argument('--rows-per-professor', type=int, default=9)
+    parser.add_argument('--hidden-rows', type=int, default=0, help="hidden rows in each generated sheet")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--only', help="run only the benchmarks whose name contains this")
+    parser.add_argument('--output', help="JSON file for the results (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument('--compare', help="results JSON of an earlier run to compare with")
+    args = parser.parse_args()
+
+    parameters = {key: getattr(args, key) for key in ['rows', 'sheets', 'subjects', 'activities', 'professors',
+                                                       'rows_per_professor', 'hidden_rows', 'seed', 'repeat', 'warmup']}
+    commit, dirty = git_commit()
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        teacher_path = make_teacher_workbook(os.path.join(folder, 'nastavnik.xlsx'), rows=args.rows, monthly_sheets=args.sheets,
+                                             subjects=args.subjects, activities=args.activities,
+                                             hidden_rows=args.hidden_rows, seed=args.seed)
+        department_path = make_department_workbook(os.path.join(folder, 'odsek.xlsx'), professors=args.professors,
+                                                   rows_per_professor=args.rows_per_professor,
+                                                   hidden_rows=args.hidden_rows, seed=args.seed)
+        for name, function in make_benchmarks(teacher_path, department_path):
+            if args.only and args.only not in name:
+                continue
+            results[name] = run(function, args.repeat, args.warmup)
+            result = results[name]
+            print(f"{name:<50} median {result['median'] * 1000:8.1f}ms  min {result['min'] * 1000:8.1f}ms  max {result['max'] * 1000:8.1f}ms")
+
+    output = args.output or os.path.join(RESULTS_FOLDER, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{commit or 'nocommit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit,
+            'dirty': dirty,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'versions': {package: version(package) for package in ['pandas', 'numpy', 'openpyxl', 'reportlab']},
+            'parameters': parameters,
+            'results': results,
+        }, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        compare(results, parameters, args.compare)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+import os
+import re
+import random
+import datetime
+import zipfile
+from xml.sax.saxutils import escape
+from openpyxl import Workbook
+
+# Synthetic workbooks with the layout of the real ones, for the benchmarks (run_benchmarks.py, memory_benchmarks.py).
+# Everything is generated from a seed, so the same arguments always give the same workbook.
+
+FIRST_NAMES = ["Ана", "Бобан", "Гордана", "Јован", "Милица", "Никола", "Наташа", "Стефан", "Јелена", "Марко"]
+LAST_NAMES = ["Милошевић", "Цветановић", "Јовић", "Мишић", "Петровић", "Вукотић", "Богдановић", "Михајловић", "Илић"]
+SUBJECTS = [
+    "Uvod u saobraćaj i transport", "Mehanizacija pretovara", "* Međunarodni transport i špedicija",
+    "Saobraćajno projektovanje", "* Planiranje saobraćaja", "Tehnologija transporta putnika",
+    "Arhitektura mikrokontrolera", "Elektrotehnika sa elektronikom", "Osnovi logistike", "Informacione tehnologije u saobraćaju",
+]
+PROGRAMS = ["DRUMSKI SAOBRAĆAJ", "DRUMSKI SAOBRAĆAJ I TRANSPORT (MASTER)", "SAVREMENE RAČUNARSKE TEHNOLOGIJE", "INI+DRS"]
+LESSON_WORDS = ["Identifikacija", "robe", "Transportni", "materijal", "Studija", "slučaja", "Zadaci", "kolokvijum",
+                "Tarife", "Dokumentacija", "Модели", "настајања", "путовања", "Регресиона", "анализа"]
+TEACHING_TYPES = ["predavanja", "računske vežbe"]
+MONTH_NAMES = ["jan", "feb", "mar", "apr", "maj", "jun", "jul", "avg", "sep", "okt", "nov", "dec"]
+IZVESTAJ_SECTIONS = ["Kvalitet nastavnog procesa", "Rad sa Studentima", "Podizanje kvaliteta ustanove",
+                     "Jačanje kapaciteta i imidža ustanove", "Ostalo"]
+DEPARTMENT_COLUMNS = ["Ime Predavača", "Pozicija", "Naziv Predmeta", "Studijski program", "Semestar", "Tip Predavanja",
+                      "Nedeljni Broj Časova", "Broj Grupa", "Status Predmeta", "Tip studija", "Ukupno casova", "Katedra",
+                      "Odsek", "Gde se drži"]
+# The table formula of "Ukupno casova" in the real department workbooks, stored with its cached value
+UKUPNO_CASOVA_FORMULA = (
+    '=IF(AND(masinci[[#This Row],[Pozicija]]="profesor",masinci[[#This Row],[Tip Predavanja]]="Nastava"),'
+    'masinci[[#This Row],[Nedeljni Broj Časova]]*masinci[[#This Row],[Broj Grupa]]/2,'
+    'IF(AND(masinci[[#This Row],[Pozicija]]="profesor",OR(masinci[[#This Row],[Tip Predavanja]]="Vežbe",'
+    'masinci[[#This Row],[Tip Predavanja]]="Laboratorija")),'
+    'masinci[[#This Row],[Nedeljni Broj Časova]]*masinci[[#This Row],[Broj Grupa]]/4,'
+    'masinci[[#This Row],[Nedeljni Broj Časova]]*masinci[[#This Row],[Broj Grupa]]/2))'
+)
+# Blocks of the Analiza2025 pivot sheet: (title, column of the first cell)
+ANALIZA_BLOCKS = [("OPTEREĆENJE PO STUDIJSKIM PROGRAMIMA", 3), ("OPTEREĆENJE PO SEMESTRU", 8),
+                  ("OPTEREĆENJE PO TIPU PREDAVANJA", 13), ("OPTEREĆENJE PO STATUSU PREDMETA", 18),
+                  ("OPTEREĆENJE PO KATEDRAMA", 23), ("OPTEREĆENJE PO TIPU STUDIJA", 28)]
+# Rows per professor in Analiza2025, like the real sheet (468 rows for 57 professors)
+ANALIZA_ROWS_PER_PROFESSOR = 8
+
+def academic_months(count):
+    # (month, year) from October of 2024 on
+    return [((9 + i) % 12 + 1, 2024 + (9 + i) // 12) for i in range(count)]
+
+def sentence(rng, words):
+    return " ".join(rng.choice(LESSON_WORDS) for _ in range(words))
+
+def hide_rows(worksheet, first_row, last_row, hidden_rows, rng):
+    for row in rng.sample(range(first_row, last_row + 1), min(hidden_rows, max(0, last_row - first_row + 1))):
+        worksheet.row_dimensions[row].hidden = True
+
+def add_osnovni_podaci(workbook, rng, subjects, first_name, last_name):
+    ws = workbook.create_sheet("Osnovni podaci")
+    ws["B3"], ws["C3"] = "Ime", first_name
+    ws["B4"], ws["C4"] = "Prezime", last_name
+    ws["B5"], ws["C5"] = "Zvanje", "asistent"
+    row = 7
+    for title in ["Ukupan broj predmeta na kojima je nastavnik angažovan ", "Ukupno opterećenje"]:
+        ws.cell(row, 2, title)
+        for offset, level in enumerate(["Osnovne studije", "Specijalističke studije", "Master studije"], 1):
+            ws.cell(row + offset, 2, level)
+            ws.cell(row + offset, 3, rng.randint(1, 8))
+        ws.cell(row + 4, 2, "Ukupno")
+        row += 6
+    ws.cell(row, 2, "Predmeti na kojima je saradnik angažovan")
+    for i, subject in enumerate(subjects, 1):
+        ws.cell(row + i, 2, f"[Predmet {i}]")
+        ws.cell(row + i, 3, subject)
+    row += len(subjects) + 2
+    for title, item in [("Članstvo u komisijama (timovima) ", "Komisija"), ("Ostala zaduženja ", "Zaduženje")]:
+        ws.cell(row, 2, title)
+        for i in range(1, 6):
+            ws.cell(row + i, 2, f"[{item} {i}]")
+        row += 8
+
+def add_monthly_sheet(workbook, rng, name, activities):
+    ws = workbook.create_sheet(name)
+    row = 3
+    for section in IZVESTAJ_SECTIONS:
+        ws.cell(row, 2, section)
+        ws.cell(row + 1, 3, "Kratak opis (max 30 reči)")
+        row += 2
+        for i in range(1, activities + 1):
+            ws.cell(row, 2, f"{section} {i}")
+            ws.cell(row, 3, sentence(rng, 6))
+            ws.cell(row, 4, rng.randint(0, 12))
+            ws.cell(row, 5, rng.randint(0, 12))
+            row += 2
+        row += 2
+
+def add_evidencija(workbook, rng, rows, subjects, months, hidden_rows):
+    ws = workbook.create_sheet("Evidencija drzanja nastave")
+    ws.append(["Datum ", "Odsek", "Studijski program", "Predmet", "Tip nastave", "Broj časova nastave",
+               "Nastavna jedinica", "Broj prisutnih studenata"])
+    for i in range(rows):
+        month, year = months[i * len(months) // max(rows, 1)]
+        ws.append([datetime.datetime(year, month, rng.randint(1, 28)), "Niš", rng.choice(PROGRAMS), rng.choice(subjects),
+                   rng.choice(TEACHING_TYPES), rng.randint(1, 4), sentence(rng, rng.randint(3, 14)), rng.randint(0, 60)])
+    hide_rows(ws, 2, rows + 1, hidden_rows, rng)
+
+def add_analiza_nastave(workbook, rng, subjects, months, hidden_rows):
+    # Two pivot tables side by side, like the export the teachers paste in: hours per subject (B-E)
+    # and the average number of students (J-K), grouped by location, year and month
+    ws = workbook.create_sheet("Analiza nastave")
+    ws["B6"], ws["C6"], ws["J6"], ws["K6"] = " Broj časova nastave", "Vrsta nastave", "Predmeti", "Prosečan broj studenata"
+    ws["B7"], ws["C7"], ws["D7"], ws["E7"] = "Predmeti", rng.choice(TEACHING_TYPES), "(blank)", "Grand Total"
+    table1 = [["Niš"]]
+    table2 = [["Niš"]]
+    for year in sorted({year for _, year in months}):
+        table1.append([str(year)])
+        table2.append([str(year)])
+        for month, month_year in months:
+            if month_year != year:
+                continue
+            table1.append([MONTH_NAMES[month - 1]])
+            table2.append([MONTH_NAMES[month - 1]])
+            for subject in subjects:
+                hours = rng.randint(1, 12)
+                table1.append([subject, hours, None, hours])
+                table2.append([subject, round(rng.uniform(5, 60), 2)])
+    table1.append(["(blank)"])
+    table2.append(["(blank)"])
+    for i, values in enumerate(table1):
+        for j, value in enumerate(values):
+            ws.cell(8 + i, 2 + j, value)
+    for i, values in enumerate(table2):
+        for j, value in enumerate(values):
+            ws.cell(7 + i, 10 + j, value)
+    hide_rows(ws, 8, 7 + max(len(table1), len(table2)), hidden_rows, rng)
+
+def make_teacher_workbook(path, rows=300, monthly_sheets=8, subjects=8, activities=3, hidden_rows=0, seed=0):
+    # An "Izveštaj o radu" workbook: Osnovni podaci, Evidencija drzanja nastave with rows lessons,
+    # monthly_sheets monthly reports, PadajucaLista and Analiza nastave. hidden_rows rows are hidden
+    # in both Evidencija drzanja nastave and Analiza nastave.
+    rng = random.Random(seed)
+    subject_names = [SUBJECTS[i % len(SUBJECTS)] + (f" {i // len(SUBJECTS) + 1}" if i >= len(SUBJECTS) else "")
+                     for i in range(subjects)]
+    months = academic_months(monthly_sheets)
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    add_osnovni_podaci(workbook, rng, subject_names, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES))
+    add_evidencija(workbook, rng, rows, subject_names, months, hidden_rows)
+    for month, year in months:
+        add_monthly_sheet(workbook, rng, f"{month:02d}-{year}", activities)
+    workbook.create_sheet("PadajucaLista").append(TEACHING_TYPES)
+    add_analiza_nastave(workbook, rng, subject_names, months, hidden_rows)
+    workbook.save(path)
+    return path
+
+def add_department_analysis(workbook, rng, names):
+    # The two pivot sheets of the real department workbooks. No report reads them, but they are in every
+    # upload: Analiza2025 has the load of every professor broken down several ways, Analiza_S the averages.
+    ws = workbook.create_sheet("Analiza2025")
+    for title, column in ANALIZA_BLOCKS:
+        ws.cell(6, column, title)
+    row = 8
+    for name in names:
+        # The professor's row with the totals of every block, then a few breakdown rows in random blocks
+        for _, column in ANALIZA_BLOCKS:
+            ws.cell(row, column, name)
+            ws.cell(row, column + 1, round(rng.uniform(2, 30), 2))
+        for offset in range(1, ANALIZA_ROWS_PER_PROFESSOR):
+            column = rng.choice(ANALIZA_BLOCKS)[1]
+            ws.cell(row + offset, column, rng.choice(PROGRAMS + SUBJECTS))
+            ws.cell(row + offset, column + 1, round(rng.uniform(0.5, 12), 2))
+        row += ANALIZA_ROWS_PER_PROFESSOR
+
+    ws = workbook.create_sheet("Analiza_S")
+    ws["I2"], ws["L2"] = "Profesori", "Asistenti"
+    for i, label in enumerate(["Izdvajanje za Opterecenje", "nagib", "Konstanta", "Prosečno opterećenje"]):
+        ws.cell(3 + i, 9, label)
+        ws.cell(3 + i, 12, label)
+    ws["J3"], ws["J4"], ws["J5"], ws["J6"] = 0.3, "=J3/6", "=0-J4*6", f"=AVERAGE(I10:I{9 + len(names)})"
+    ws["C6"], ws["D6"] = "Odsek", "(All)"
+    for i, name in enumerate(names):
+        ws.cell(10 + i, 3, name)
+        ws.cell(10 + i, 4, rng.choice(["profesor", "asistent"]))
+        ws.cell(10 + i, 5, round(rng.uniform(2, 30), 2))
+        ws.cell(10 + i, 6, round(rng.uniform(0.5, 1.5), 2))
+        ws.cell(10 + i, 9, round(rng.uniform(2, 30), 2))
+
+def add_cached_formulas(path, sheet_xml, column, formula):
+    # openpyxl can't save a formula together with its cached value. The real workbooks have both, and the
+    # formula text makes up most of their size, so it is put in front of every value of column in the
+    # saved sheet XML. Readers with data_only (pandas, the app) still get the cached values.
+    cell = re.compile(rf'(<c r="{column}\d+"[^>]*>)(<v>)')
+    formula_xml = f"<f>{escape(formula.lstrip('='))}</f>"
+    with zipfile.ZipFile(path) as source:
+        members = [(info, source.read(info)) for info in source.infolist()]
+    tmp_path = path + '.tmp'
+    with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as target:
+        for info, content in members:
+            if info.filename == sheet_xml:
+                content = cell.sub(lambda match: match.group(1) + formula_xml + match.group(2), content.decode('utf-8')).encode('utf-8')
+            target.writestr(info, content)
+    os.replace(tmp_path, path)
+
+def make_department_workbook(path, professors=60, rows_per_professor=9, hidden_rows=0, seed=0):
+    # A department ("Odsek") workbook: one row per subject and teaching type of every professor, with the
+    # "Ukupno casova" formulas and the Analiza2025 / Analiza_S pivot sheets of the real ones
+    rng = random.Random(seed)
+    workbook = Workbook()
+    ws = workbook.active
+    ws.title = "Podaci2025"
+    ws.append(DEPARTMENT_COLUMNS)
+    names = [f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]}"
+             + (f" {i // (len(FIRST_NAMES) * len(LAST_NAMES)) + 1}" if i >= len(FIRST_NAMES) * len(LAST_NAMES) else "")
+             for i in range(professors)]
+    # Rows of a professor are not next to each other in the real workbooks either
+    rows = [name for name in names for _ in range(rows_per_professor)]
+    rng.shuffle(rows)
+    for name in rows:
+        teaching_type = rng.choice(["Predavanja", "Vežbe"])
+        weekly_hours = rng.randint(1, 4)
+        ws.append([name, rng.choice(["profesor", "asistent"]), rng.choice(SUBJECTS), rng.choice(["INI", "DRS", "SRT"]),
+                   rng.choice(["I", "III", "V"]), teaching_type, weekly_hours, rng.randint(1, 3),
+                   rng.choice(["obavezan", "izboran"]), rng.choice(["osnovne", "master"]), weekly_hours / 2,
+                   rng.choice(["IZŽS", "INI"]), "Niš", None])
+    hide_rows(ws, 2, len(rows) + 1, hidden_rows, rng)
+    add_department_analysis(workbook, rng, names)
+    workbook.create_sheet("PadajucaLista").append(["Predavanja", "Vežbe"])
+    workbook.save(path)
+    add_cached_formulas(path, "xl/worksheets/sheet1.xml", "K", UKUPNO_CASOVA_FORMULA)
+    return path
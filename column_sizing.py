@@ -0,0 +1,23 @@
+from functools import lru_cache
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+# Column widths of the report tables measured from their content. Table cells repeat a lot (subjects,
+# teaching types, programs), so every distinct value of a column is measured once and every
+# (text, font, size) once per process.
+WIDTH_CACHE_SIZE = 8192
+
+@lru_cache(maxsize=WIDTH_CACHE_SIZE)
+def text_width(text, font_name='DejaVuSans', font_size=9):
+    # Width of the widest line of text
+    return max(stringWidth(line, font_name, font_size) for line in text.split('\n'))
+
+def column_max_widths(rows, font_name='DejaVuSans', font_size=9, padding=0):
+    # Width of the widest cell of every column of rows (a list of equally long rows), plus padding
+    if not rows:
+        return []
+    return [max(text_width(text, font_name, font_size) for text in {str(cell) for cell in column}) + padding
+            for column in zip(*rows)]
+
+def fit_widths(widths, min_widths, max_widths):
+    # Every width clamped to its column's [min, max]
+    return [max(low, min(high, width)) for width, low, high in zip(widths, min_widths, max_widths)]
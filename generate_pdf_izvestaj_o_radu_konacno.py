@@ -1,57 +1,38 @@
-import os
 import textwrap
-import pandas as pd
+import numpy as np
 from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import pdfmetrics
-from reportlab.platypus import Image
-from reportlab.lib.enums import TA_CENTER
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer, PageBreak
+import pdf_styles
+import metrics
+from workbook_utils import get_monthly_sheets, get_professor_name, scan_sections
 
-def generate_pdf_testing_test1(data, pdf_path, professor_name):
-    # Register fonts
-    font_path_regular = os.path.join(os.path.dirname(__file__), 'static/fonts', 'DejaVuSans.ttf')
-    font_path_bold = os.path.join(os.path.dirname(__file__), 'static/fonts', 'DejaVuSans-Bold.ttf')
-    pdfmetrics.registerFont(TTFont('DejaVuSans', font_path_regular))
-    pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', font_path_bold))
-
-    # Define styles
-    styles = getSampleStyleSheet()  
-    style_normal = styles['Normal']
-    style_normal.fontName = 'DejaVuSans'
-    style_normal.fontSize = 9
-    style_normal.leading = 12
-
-    style_heading1 = styles['Heading1']
-    style_heading1.fontName = 'DejaVuSans-Bold'
-    style_heading1.fontSize = 14
-    style_heading1.spaceAfter = 12
-
-    style_heading2 = styles['Heading2']
-    style_heading2.fontName = 'DejaVuSans-Bold'
-    style_heading2.fontSize = 12
-    style_heading2.spaceAfter = 6
-
-    style_sheetName = styles['Heading1']
-    style_sheetName.fontName = 'DejaVuSans-Bold'
-    style_sheetName.fontSize = 14
-    style_sheetName.spaceAfter = 12
-
-    style_heading_center = ParagraphStyle(
-    name='HeadingCenter',
-    parent=styles['Heading1'],
-    alignment=TA_CENTER,
-    fontSize=16,
-    spaceAfter=12,
-)
+# selected_sheet for the whole academic year: every monthly sheet in one PDF.
+# Excel doesn't allow '*' in sheet names, so it can't be mistaken for a real month.
+ALL_MONTHS = "*"
 
-    # Create a PDF document
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4, 
+def make_doc(pdf_path):
+    return SimpleDocTemplate(pdf_path, pagesize=A4,
                           leftMargin=0.5*inch, rightMargin=0.5*inch,
                           topMargin=0.5*inch, bottomMargin=0.5*inch)
+
+def generate_pdf_testing_test1(data, pdf_path, professor_name):
+    doc = make_doc(pdf_path)
+    with metrics.span('layout', 'izvestaj'):
+        story = build_story(doc, data, professor_name)
+    with metrics.span('build', 'izvestaj'):
+        doc.build(story)
+
+def build_story(doc, data, professor_name, outline_level=0):
+    # Flowables of the report, laid out for the frame of doc (also used by reports.py for the combined PDF).
+    # With more than one month (ALL_MONTHS), every month starts on a new page with its own bookmark.
+    # Fonts and styles are built once per process (pdf_styles)
+    pdf_styles.register_fonts()
+    style_normal = pdf_styles.NORMAL
+    style_heading2 = pdf_styles.HEADING2
+    style_sheetName = pdf_styles.HEADING1
+    style_heading_center = pdf_styles.HEADING_CENTER
+
     story = []
 
     # Predefined sections
@@ -63,10 +44,15 @@ def generate_pdf_testing_test1(data, pdf_path, professor_name):
         "Ostalo"
     ]
 
-    for sheet_name, section_content in data.items():
-        logo_path = os.path.join(os.path.dirname(__file__), 'static/images/akademija-logo-boja-latinica 1.png')  # <-- change if needed
+    for sheet_index, (sheet_name, section_content) in enumerate(data.items()):
+        if len(data) > 1:
+            if sheet_index > 0:
+                story.append(PageBreak())
+            story.append(pdf_styles.Bookmark(f"izvestaj-{sheet_name}", sheet_name, outline_level))
+
+        # Shared logo, decoded once per process (pdf_styles)
         try:
-            logo = Image(logo_path, width=150, height=60)  # You can adjust size
+            logo = pdf_styles.LogoImage(width=150, height=60)
         except:
             logo = Paragraph("", style_normal)
 
@@ -79,13 +65,7 @@ def generate_pdf_testing_test1(data, pdf_path, professor_name):
              ['', professor_title, '']],
             colWidths=[doc.width * 0.2, doc.width * 0.6, doc.width * 0.2]
         )
-        header_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-            ('ALIGN', (1, 0), (1, -1), 'CENTER'),
-            ('ALIGN', (2, 0), (2, 0), 'RIGHT'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ]))
+        header_table.setStyle(pdf_styles.IZVESTAJ_HEADER_TABLE_STYLE)
         story.append(header_table)
         story.append(Spacer(1, 12))
 
@@ -136,12 +116,7 @@ def generate_pdf_testing_test1(data, pdf_path, professor_name):
                         col_width * 0.15 #E width
                     ]
                     table = Table(data_table, colWidths=col_widths)
-                    table.setStyle(TableStyle([
-                        ('BOX', (0,0), (-1,-1), 1, colors.black),
-                        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-                        ('PADDING', (0,0), (-1,-1), 6),
-                        ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
-                    ]))
+                    table.setStyle(pdf_styles.GRID_TABLE_STYLE)
                     story.append(table)
             elif section == "Ostalo":
                 # Single column layout for Ostalo (combines B and C)
@@ -171,10 +146,7 @@ def generate_pdf_testing_test1(data, pdf_path, professor_name):
                     
                     # Create bordered box
                     table = Table([[content_paragraphs]], colWidths=[doc.width - inch])
-                    table.setStyle(TableStyle([
-                        ('BOX', (0,0), (-1,-1), 1, colors.black),
-                        ('PADDING', (0,0), (-1,-1), 6),
-                    ]))
+                    table.setStyle(pdf_styles.BOX_TABLE_STYLE)
                     story.append(table)
             else:
                 # Two-column layout with grid between B and C
@@ -198,108 +170,57 @@ def generate_pdf_testing_test1(data, pdf_path, professor_name):
                     col_b_width = col_width * 0.55
                     col_c_width = col_width * 0.45
                     table = Table(data_table, colWidths=[col_b_width, col_c_width])
-                    table.setStyle(TableStyle([
-                        ('BOX', (0,0), (-1,-1), 1, colors.black),  # Outer border
-                        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-                        ('PADDING', (0,0), (-1,-1), 6),
-                        ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),  # Grid between all cells
-                    ]))
+                    table.setStyle(pdf_styles.GRID_TABLE_STYLE)
                     story.append(table)
 
             story.append(Spacer(1, 12))
 
-    doc.build(story)
+    return story
 
-def process_excel(filepath, selected_sheet=None):
+@metrics.timed('extract', 'izvestaj')
+def process_excel(source, selected_sheet=None):
     try:
-        # Get all sheets from the Excel file
-        xls = pd.ExcelFile(filepath)
-        all_sheets = xls.sheet_names
-        
-        # Filter out special sheets
-        excluded_sheets = ["Analiza nastave", "Evidencija drzanja nastave", "Osnovni podaci", "PadajucaLista"]
-        available_sheets = [sheet for sheet in all_sheets if sheet not in excluded_sheets]
+        # Get all monthly sheets from the Excel file (special sheets are filtered out)
+        available_sheets = get_monthly_sheets(source)
         
         if not available_sheets:
             raise ValueError("No monthly report sheets found in the Excel file")
         
-        # If no sheet is selected, use the first available one
-        sheet_to_process = selected_sheet if selected_sheet in available_sheets else available_sheets[0]
-        
-        # Read the selected sheet
-        sheets = pd.read_excel(filepath, sheet_name=[sheet_to_process], header=None)
-        extracted_data = {}
+        if selected_sheet == ALL_MONTHS:
+            sheet_names = available_sheets
+        else:
+            # If no sheet is selected, use the first available one
+            sheet_names = [selected_sheet if selected_sheet in available_sheets else available_sheets[0]]
 
-        # Read "Osnovni podaci" sheet for professor's name
-        osnovni_podaci = pd.read_excel(filepath, sheet_name="Osnovni podaci", header=None)
-        
-        # Extract professor's name
-        ime_mask = osnovni_podaci[1] == "Ime"
-        prezime_mask = osnovni_podaci[1] == "Prezime"
-        
-        if not ime_mask.any() or not prezime_mask.any():
-            raise ValueError('Could not find "Ime" or "Prezime" in "Osnovni podaci" sheet')
-            
-        ime_row = ime_mask.idxmax()
-        prezime_row = prezime_mask.idxmax()
-        
-        professor_name = f"{str(osnovni_podaci.iloc[ime_row, 2]).strip()} {str(osnovni_podaci.iloc[prezime_row, 2]).strip()}"
+        extracted_data = {}
+        professor_name = get_professor_name(source)
         
-        # Process the selected sheet
-        for sheet, df in sheets.items():
-            sections = [
-                "Kvalitet nastavnog procesa",
-                "Rad sa Studentima",
-                "Podizanje kvaliteta ustanove",
-                "Jačanje kapaciteta i imidža ustanove",
-                "Ostalo"
-            ]
-            sections_lower = [s.lower() for s in sections]
-            
-            df = df.map(lambda x: str(x).strip() if pd.notna(x) and str(x).strip() != "" else "")
+        sections = [
+            "Kvalitet nastavnog procesa",
+            "Rad sa Studentima",
+            "Podizanje kvaliteta ustanove",
+            "Jačanje kapaciteta i imidža ustanove",
+            "Ostalo"
+        ]
+        sections_lower = [s.lower() for s in sections]
+
+        # Process the selected sheets
+        for sheet in sheet_names:
+            # The sheet is streamed, only the first cells and columns B-E of its rows are kept
+            first, has_data, rows = scan_sections(source, sheet)
+
+            # A row starts a section when its first non-empty cell is a section name. Only the last
+            # "Ostalo" row starts the Ostalo section, earlier ones are data rows of the section before it.
+            starts_section = np.isin(first, sections_lower)
+            ostalo_rows = np.flatnonzero(first == "ostalo")
+            starts_section[ostalo_rows[:-1]] = False
+
+            # Every section gets columns B-E of the non-empty rows up to the next section
             section_data = {section: [] for section in sections}
-            current_section = None
-            last_ostalo_index = -1
-
-            # Find last "Ostalo" occurrence
-            for i, row in enumerate(df.values.tolist()):
-                row_cells = [cell for cell in row if cell]
-                if row_cells and row_cells[0].lower() == "ostalo":
-                    last_ostalo_index = i
-
-            # Process data - now collecting all 4 columns (B, C, D, E)
-            for i, row in enumerate(df.values.tolist()):
-                row_cells = [cell for cell in row if cell]
-                if not row_cells:
-                    continue
-
-                first_cell = row_cells[0].lower()
-                if first_cell in sections_lower:
-                    if first_cell == "ostalo" and i == last_ostalo_index:
-                        current_section = "Ostalo"
-                    elif first_cell == "ostalo":
-                        if current_section:
-                            # Collect all 4 columns
-                            cols = (
-                                row[1] if len(row) > 1 else "",
-                                row[2] if len(row) > 2 else "",
-                                row[3] if len(row) > 3 else "",
-                                row[4] if len(row) > 4 else ""
-                            )
-                            section_data[current_section].append(cols)
-                    else:
-                        current_section = sections[sections_lower.index(first_cell)]
-                    continue
-
-                if current_section:
-                    # Collect all 4 columns for all rows
-                    cols = (
-                        row[1] if len(row) > 1 else "",
-                        row[2] if len(row) > 2 else "",
-                        row[3] if len(row) > 3 else "",
-                        row[4] if len(row) > 4 else ""
-                    )
-                    section_data[current_section].append(cols)
+            boundaries = np.flatnonzero(starts_section).tolist()
+            for start, end in zip(boundaries, boundaries[1:] + [len(rows)]):
+                section = sections[sections_lower.index(first[start])]
+                section_data[section].extend(rows[i] for i in range(start + 1, end) if has_data[i])
 
             extracted_data[sheet] = section_data
 
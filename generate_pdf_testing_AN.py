@@ -1,16 +1,11 @@
-import os
+import numpy as np
 import pandas as pd
 from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import pdfmetrics
-from reportlab.platypus import Image
-from reportlab.lib.enums import TA_CENTER
-from reportlab.pdfbase.pdfmetrics import stringWidth
-import openpyxl
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+import pdf_styles
+import metrics
+from workbook_utils import iter_row_blocks, get_professor_name
 
 def is_header(row):
     non_empty = row.dropna()
@@ -106,44 +101,121 @@ def analyze_sheet_structure(filepath, sheet_name="Analiza nastave"):
         print(f"Error analyzing sheet: {e}")
         return None
 
-def find_header_and_cols(df, col_names):
-    for r_idx, row in df.iterrows():
-        row_values = [str(v).strip() for v in row]
-        if all(name in row_values for name in col_names):
-            col_indices = {name: row_values.index(name) for name in col_names}
-            return r_idx, col_indices
-    return -1, None
-
-def unhide_all_rows(filepath, sheet_name):
-    wb = openpyxl.load_workbook(filepath)
-    ws = wb[sheet_name]
-    for row in ws.row_dimensions:
-        ws.row_dimensions[row].hidden = False
-    wb.save(filepath)
-
-def process_analiza_nastave(filepath):
+MONTHS = {'jan', 'feb', 'mar', 'apr', 'maj', 'jun', 'jul', 'avg', 'sep', 'okt', 'nov', 'dec'}
+# Cells that only carry location / year / month context, never a subject
+CONTEXT_VALUES = {"Niš", "2025", "2024", "jan", "okt", "nov", "dec", ""}
+
+def last_cell_per_row(text, mask):
+    # Text of the last cell in every row where mask is set, None for rows without one
+    has_cell = mask.any(axis=1)
+    last_col = mask.shape[1] - 1 - mask[:, ::-1].argmax(axis=1)
+    return np.where(has_cell, text[np.arange(len(text)), last_col], None)
+
+def index_block(values):
+    # One pass over a block of raw cells: the text of every cell, where the empty rows (table ends) are,
+    # and the location / year / month context every row sets
+    # Empty cells read as 'nan', like str() of the NaN pandas puts there
+    text = pd.Series(values.ravel(), dtype=object).astype(str).fillna('nan').str.strip()
+    lower = text.str.lower().to_numpy(dtype=object).reshape(values.shape)
+    is_year = (text.str.isdigit() & (text.str.len() == 4)).to_numpy().reshape(values.shape)
+    text = text.to_numpy(dtype=object).reshape(values.shape)
+
+    # A cell is a location, otherwise a year, otherwise a month; the last one in the row wins
+    is_location = lower == 'niš'
+    is_year = is_year & ~is_location
+    is_month = np.isin(lower, list(MONTHS)) & ~is_location & ~is_year
+
+    empty = pd.isna(values).all(axis=1) | (text == "").all(axis=1)
+    return {
+        'values': values,
+        'text': text,
+        'empty_rows': np.flatnonzero(empty),
+        'location': last_cell_per_row(text, is_location),
+        'year': last_cell_per_row(text, is_year),
+        'month': last_cell_per_row(text, is_month),
+    }
+
+def find_header_and_cols(index, col_names):
+    # First row that has all col_names, and the first column of each of them
+    text = index['text']
+    matches = {name: text == name for name in col_names}
+    has_all = np.logical_and.reduce([match.any(axis=1) for match in matches.values()])
+    if not has_all.any():
+        return -1, None
+    r_idx = int(has_all.argmax())
+    return r_idx, {name: int(match[r_idx].argmax()) for name, match in matches.items()}
+
+def scan_tables(blocks, tables):
+    # Every table of tables = {key: col_names} in one pass over the row blocks of the sheet. A table is
+    # the rows under the first row that has all its col_names, up to the first empty row.
+    # Returns {key: (cols, rows)} (cols is None for a table that wasn't found); every row is
+    # ("location - year - month" context seen so far in the table, {col_name: (text, value)}).
+    found = {key: {'col_names': col_names, 'cols': None, 'done': False, 'context': ["", "", ""], 'rows': []}
+             for key, col_names in tables.items()}
+    for block in blocks:
+        index = index_block(block)
+        width = block.shape[1]
+        for table in found.values():
+            if table['done']:
+                continue
+            start = 0
+            if table['cols'] is None:
+                header_row, table['cols'] = find_header_and_cols(index, table['col_names'])
+                if header_row == -1:
+                    continue
+                start = header_row + 1
+            empty_rows = index['empty_rows']
+            later_empty = empty_rows[empty_rows >= start]
+            end = int(later_empty[0]) if len(later_empty) else len(block)
+            table['done'] = len(later_empty) > 0
+            context = table['context']
+            for r_idx in range(start, end):
+                for i, key in enumerate(('location', 'year', 'month')):
+                    if index[key][r_idx] is not None:
+                        context[i] = index[key][r_idx]
+                # Columns past the end of the block are empty cells
+                cells = {name: (index['text'][r_idx, col], index['values'][r_idx, col]) if col < width else ('nan', np.nan)
+                         for name, col in table['cols'].items()}
+                table['rows'].append((" - ".join(context), cells))
+        if all(table['done'] for table in found.values()):
+            # The rest of the sheet isn't needed
+            break
+    return {key: (table['cols'], table['rows']) for key, table in found.items()}
+
+def is_valid_number(value):
+    # Accept both numeric and string numbers
+    if pd.api.types.is_number(value):
+        return True
     try:
-        print("\n=== Starting Data Processing (Un-Pivot Method) ===")
-        # Only unhide all rows in 'Analiza nastave' before reading
-        unhide_all_rows(filepath, "Analiza nastave")
-        df = pd.read_excel(
-            filepath,
-            sheet_name="Analiza nastave",
-            header=None,
-            engine='openpyxl'
-        )
+        if str(value).strip() and str(value).strip().lower() != 'nan':
+            float(value)
+            return True
+    except Exception:
+        pass
+    return False
 
-        # -- Table 1: Broj časova nastave --
+@metrics.timed('extract', 'an')
+def process_analiza_nastave(source):
+    try:
+        print("\n=== Starting Data Processing (Un-Pivot Method) ===")
         t1_header_variants = [
             ["Predmeti", "predavanja", "(blank)", "Grand Total"],
             ["Predmeti", "računske vežbe", "(blank)", "Grand Total"]
         ]
-        t1_header_row, t1_cols = -1, None
-        for header_names in t1_header_variants:
-            t1_header_row, t1_cols = find_header_and_cols(df, header_names)
-            if t1_header_row != -1:
+        t2_header_names = ["Predmeti", "Prosečan broj studenata"]
+        # Hidden rows are read as well: the sheet is streamed through openpyxl in read-only
+        # mode, which ignores row visibility, so the uploaded file is never modified
+        # Both tables (and both header variants of table 1) are found in one pass over the sheet
+        tables = scan_tables(iter_row_blocks(source, "Analiza nastave"),
+                             {0: t1_header_variants[0], 1: t1_header_variants[1], 't2': t2_header_names})
+
+        # -- Table 1: Broj časova nastave --
+        t1_cols = None
+        for variant, header_names in enumerate(t1_header_variants):
+            t1_cols, t1_rows = tables[variant]
+            if t1_cols is not None:
                 break
-        if t1_header_row == -1:
+        if t1_cols is None:
             raise ValueError("Table 1 headers not found")
         # Use the actual found header for table1_data
         table1_data = [header_names]
@@ -156,84 +228,32 @@ def process_analiza_nastave(filepath):
                 break
         if hours_col_name is None:
             raise ValueError("Neither 'predavanja' nor 'računske vežbe' found in Table 1 headers")
-        
-        # Context tracking
-        current_location, current_year, current_month = "", "", ""
-        months = {'jan', 'feb', 'mar', 'apr', 'maj', 'jun', 'jul', 'avg', 'sep', 'okt', 'nov', 'dec'}
-        context_values = {"Niš", "2025", "2024", "jan", "okt", "nov", "dec", ""}
-
-        for r_idx in range(t1_header_row + 1, len(df)):
-            row = df.iloc[r_idx]
-            # Stop Table 1 extraction at the first empty row
-            if row.isnull().all() or all(str(cell).strip() == "" for cell in row):
-                break
-
-            # Find context, which might be in various columns (like Table 2)
-            for cell_val in row:
-                s_cell_val = str(cell_val).strip()
-                l_cell_val = s_cell_val.lower()
-                if l_cell_val == 'niš': current_location = s_cell_val
-                elif s_cell_val.isdigit() and len(s_cell_val) == 4: current_year = s_cell_val
-                elif l_cell_val in months: current_month = s_cell_val
 
+        for context, cells in t1_rows:
             # Check for subject and data
-            subject = str(row.iloc[t1_cols["Predmeti"]]).strip()
-            predavanja_val = row.iloc[t1_cols[hours_col_name]]
-
-            # Accept both numeric and string numbers
-            is_valid_predavanja = False
-            if pd.api.types.is_number(predavanja_val):
-                is_valid_predavanja = True
-            else:
-                try:
-                    if str(predavanja_val).strip() and str(predavanja_val).strip().lower() != 'nan':
-                        float(predavanja_val)
-                        is_valid_predavanja = True
-                except Exception:
-                    pass
-
-            if subject and subject not in context_values and subject.lower() != "nan" and is_valid_predavanja:
-                predmeti_str = f"{current_location} - {current_year} - {current_month} - {subject}"
-                data_row = [
-                    predmeti_str,
+            subject = cells["Predmeti"][0]
+            predavanja_val = cells[hours_col_name][1]
+            if subject and subject not in CONTEXT_VALUES and subject.lower() != "nan" and is_valid_number(predavanja_val):
+                table1_data.append([
+                    f"{context} - {subject}",
                     predavanja_val,
-                    row.iloc[t1_cols["(blank)"]],
-                    row.iloc[t1_cols["Grand Total"]]
-                ]
-                table1_data.append(data_row)
+                    cells["(blank)"][1],
+                    cells["Grand Total"][1]
+                ])
 
         # -- Table 2: Prosečan broj studenata --
-        t2_header_names = ["Predmeti", "Prosečan broj studenata"]
-        t2_header_row, t2_cols = find_header_and_cols(df, t2_header_names)
-        if t2_header_row == -1: raise ValueError("Table 2 headers not found")
+        t2_cols, t2_rows = tables['t2']
+        if t2_cols is None: raise ValueError("Table 2 headers not found")
 
         table2_data = [["Predmeti", "Prosečan broj studenata"]]
-        
-        current_location, current_year, current_month = "", "", ""
-
-        for r_idx in range(t2_header_row + 1, len(df)):
-            row = df.iloc[r_idx]
-            # Stop Table 2 extraction at the first empty row
-            if row.isnull().all() or all(str(cell).strip() == "" for cell in row):
-                break
-
-            # Find context, which might be in various columns
-            for cell_val in row:
-                s_cell_val = str(cell_val).strip()
-                l_cell_val = s_cell_val.lower()
-                if l_cell_val == 'niš': current_location = s_cell_val
-                elif s_cell_val.isdigit() and len(s_cell_val) == 4: current_year = s_cell_val
-                elif l_cell_val in months: current_month = s_cell_val
 
+        for context, cells in t2_rows:
             # Check for subject and data
-            subject = str(row.iloc[t2_cols["Predmeti"]]).strip()
-            prosecan_val = row.iloc[t2_cols["Prosečan broj studenata"]]
-
+            subject = cells["Predmeti"][0]
+            prosecan_val = cells["Prosečan broj studenata"][1]
             # Only add if subject is not empty, not nan, and not a context value
-            if subject and subject not in context_values and subject.lower() != "nan" and pd.api.types.is_number(prosecan_val):
-                predmeti_str = f"{current_location} - {current_year} - {current_month} - {subject}"
-                data_row = [predmeti_str, prosecan_val]
-                table2_data.append(data_row)
+            if subject and subject not in CONTEXT_VALUES and subject.lower() != "nan" and pd.api.types.is_number(prosecan_val):
+                table2_data.append([f"{context} - {subject}", prosecan_val])
         
         tables_data = {
             'table1': table1_data,
@@ -247,15 +267,7 @@ def process_analiza_nastave(filepath):
                 print(row)
                 
         # Read professor name
-        osnovni_podaci = pd.read_excel(filepath, sheet_name="Osnovni podaci", header=None)
-        ime_mask = osnovni_podaci[1] == "Ime"
-        prezime_mask = osnovni_podaci[1] == "Prezime"
-        if not ime_mask.any() or not prezime_mask.any():
-            raise ValueError('Could not find "Ime" or "Prezime" in "Osnovni podaci" sheet')
-            
-        ime_row = ime_mask.idxmax()
-        prezime_row = prezime_mask.idxmax()
-        professor_name = f"{str(osnovni_podaci.iloc[ime_row, 2]).strip()} {str(osnovni_podaci.iloc[prezime_row, 2]).strip()}"
+        professor_name = get_professor_name(source)
         
         return tables_data, professor_name
         
@@ -265,67 +277,34 @@ def process_analiza_nastave(filepath):
         traceback.print_exc()
         return None, None
 
-def generate_pdf_an(tables_data, pdf_path, professor_name):
-    # Register fonts
-    font_path_regular = os.path.join(os.path.dirname(__file__), 'static/fonts', 'DejaVuSans.ttf')
-    font_path_bold = os.path.join(os.path.dirname(__file__), 'static/fonts', 'DejaVuSans-Bold.ttf')
-    pdfmetrics.registerFont(TTFont('DejaVuSans', font_path_regular))
-    pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', font_path_bold))
-
-    # Define styles
-    styles = getSampleStyleSheet()
-    style_normal = styles['Normal']
-    style_normal.fontName = 'DejaVuSans'
-    style_normal.fontSize = 9
-    style_normal.leading = 12
-
-    style_heading_center = ParagraphStyle(
-        name='HeadingCenter',
-        parent=styles['Heading1'],
-        fontName='DejaVuSans-Bold',
-        fontSize=16,
-        alignment=TA_CENTER,
-        spaceAfter=12,
-    )
-
-    style_sheet_title = ParagraphStyle(
-        name='SheetTitle',
-        parent=styles['Heading2'],
-        fontName='DejaVuSans-Bold',
-        fontSize=14
-    )
-
-    # Create cell styles
-    cell_style = ParagraphStyle(
-        'CellStyle',
-        parent=style_normal,
-        fontSize=9,
-        leading=12,
-        spaceBefore=3,
-        spaceAfter=3,
-    )
-
-    header_style = ParagraphStyle(
-        'HeaderStyle',
-        parent=style_normal,
-        fontName='DejaVuSans-Bold',
-        fontSize=9,
-        leading=12,
-        spaceBefore=3,
-        spaceAfter=3,
-        textColor=colors.white
-    )
-
-    # Create PDF document
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4,
+def make_doc(pdf_path):
+    return SimpleDocTemplate(pdf_path, pagesize=A4,
                           leftMargin=0.5*inch, rightMargin=0.5*inch,
                           topMargin=0.5*inch, bottomMargin=0.5*inch)
+
+def generate_pdf_an(tables_data, pdf_path, professor_name):
+    doc = make_doc(pdf_path)
+    with metrics.span('layout', 'an'):
+        story = build_story(doc, tables_data, professor_name)
+    with metrics.span('build', 'an'):
+        doc.build(story)
+
+def build_story(doc, tables_data, professor_name):
+    # Flowables of the report, laid out for the frame of doc (also used by reports.py for the combined PDF)
+    # Fonts and styles are built once per process (pdf_styles)
+    pdf_styles.register_fonts()
+    style_normal = pdf_styles.NORMAL
+    style_heading_center = pdf_styles.TITLE_CENTER
+    style_sheet_title = pdf_styles.SHEET_TITLE
+    cell_style = pdf_styles.CELL
+    header_style = pdf_styles.HEADER_CELL
+
     story = []
 
     # Create header
-    logo_path = os.path.join(os.path.dirname(__file__), 'static/images/akademija-logo-boja-latinica 1.png')
+    # Shared logo, decoded once per process (pdf_styles)
     try:
-        logo = Image(logo_path, width=150, height=60)
+        logo = pdf_styles.LogoImage(width=150, height=60)
     except:
         logo = Paragraph("", style_normal)
 
@@ -337,13 +316,7 @@ def generate_pdf_an(tables_data, pdf_path, professor_name):
         [[logo, professor_title, sheet_title]],
         colWidths=[doc.width * 0.2, doc.width * 0.6, doc.width * 0.2]
     )
-    header_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('ALIGN', (0, 0), (0, 0), 'LEFT'),    # Logo aligned left
-        ('ALIGN', (1, 0), (1, 0), 'CENTER'),  # Professor name centered
-        ('ALIGN', (2, 0), (2, 0), 'RIGHT'),   # Sheet title aligned right
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-    ]))
+    header_table.setStyle(pdf_styles.HEADER_TABLE_STYLE)
     story.append(header_table)
     story.append(Spacer(1, 20))
 
@@ -367,21 +340,7 @@ def generate_pdf_an(tables_data, pdf_path, professor_name):
         col_widths = [doc.width * 0.4] + [doc.width * 0.2] * (len(table1_processed[0]) - 1)
         
         table1 = Table(table1_processed, colWidths=col_widths)
-        table1.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1242F1')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),  # Left align first column
-            ('ALIGN', (1, 0), (-1, -1), 'CENTER'),  # Center align other columns
-            ('FONTNAME', (0, 0), (-1, 0), 'DejaVuSans-Bold'),
-            ('FONTNAME', (0, 1), (-1, -1), 'DejaVuSans'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('BOX', (0, 0), (-1, -1), 1, colors.black),
-            ('LEFTPADDING', (0, 0), (-1, -1), 5),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 5),
-        ]))
+        table1.setStyle(pdf_styles.AN_TABLE1_STYLE)
         story.append(table1)
         story.append(Spacer(1, 20))
 
@@ -405,36 +364,23 @@ def generate_pdf_an(tables_data, pdf_path, professor_name):
         col_widths = [doc.width * 0.7, doc.width * 0.3]  # 70% for names, 30% for numbers
         
         table2 = Table(table2_processed, colWidths=col_widths)
-        table2.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1242F1')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),  # Left align first column
-            ('ALIGN', (1, 0), (1, -1), 'CENTER'),  # Center align second column
-            ('FONTNAME', (0, 0), (-1, 0), 'DejaVuSans-Bold'),
-            ('FONTNAME', (0, 1), (-1, -1), 'DejaVuSans'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('BOX', (0, 0), (-1, -1), 1, colors.black),
-            ('LEFTPADDING', (0, 0), (-1, -1), 5),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 5),
-        ]))
+        table2.setStyle(pdf_styles.AN_TABLE2_STYLE)
         story.append(table2)
     
-    doc.build(story)
+    return story
 
-# File processing
-filepath = "Izveštaj o radu_za_Nastavnike_Jovan_Misic.xlsx"
+if __name__ == "__main__":
+    # File processing
+    filepath = "Izveštaj o radu_za_Nastavnike_Jovan_Misic.xlsx"
 
-# First, analyze the structure
-analysis_df = analyze_sheet_structure(filepath)
+    # First, analyze the structure
+    analysis_df = analyze_sheet_structure(filepath)
 
-# Then process the data and generate PDF
-tables_data, professor_name = process_analiza_nastave(filepath)
+    # Then process the data and generate PDF
+    tables_data, professor_name = process_analiza_nastave(filepath)
 
-if tables_data and professor_name:
-    generate_pdf_an(tables_data, "ANtest2.pdf", professor_name)
-    print("PDF generated successfully!")
-else:
-    print("Failed to generate PDF due to data processing errors.") 
\ No newline at end of file
+    if tables_data and professor_name:
+        generate_pdf_an(tables_data, "ANtest2.pdf", professor_name)
+        print("PDF generated successfully!")
+    else:
+        print("Failed to generate PDF due to data processing errors.")
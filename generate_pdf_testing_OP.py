@@ -1,75 +1,34 @@
-import os
 import textwrap
-import pandas as pd
+import numpy as np
 from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import pdfmetrics
-from reportlab.platypus import Image
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+import pdf_styles
+import metrics
+from workbook_utils import scan_sections
 
-def generate_pdf_testing_test1(data, pdf_path):
-    # Register fonts
-    font_path_regular = os.path.join(os.path.dirname(__file__), 'static/fonts', 'DejaVuSans.ttf')
-    font_path_bold = os.path.join(os.path.dirname(__file__), 'static/fonts', 'DejaVuSans-Bold.ttf')
-    pdfmetrics.registerFont(TTFont('DejaVuSans', font_path_regular))
-    pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', font_path_bold))
-
-    # Define styles
-    styles = getSampleStyleSheet()  
-    style_normal = styles['Normal']
-    style_normal.fontName = 'DejaVuSans'
-    style_normal.fontSize = 9
-    style_normal.leading = 12
-
-    style_heading1 = styles['Heading1']
-    style_heading1.fontName = 'DejaVuSans-Bold'
-    style_heading1.fontSize = 14
-    style_heading1.spaceAfter = 12
-
-    style_heading2 = styles['Heading2']
-    style_heading2.fontName = 'DejaVuSans-Bold'
-    style_heading2.fontSize = 12
-    style_heading2.spaceAfter = 6
-
-    style_heading2_nobold = styles['Heading2']
-    style_heading2_nobold.fontName = 'DejaVuSans'
-    style_heading2_nobold.fontSize = 12
-    style_heading2_nobold.spaceAfter = 6
-
-    # Add a specific style for sheet title
-    style_sheet_title = ParagraphStyle(
-        name='SheetTitle',
-        parent=style_heading2,  # Inherit from style_heading2 to keep other parameters
-        fontSize=16,  # Only change the font size
-        fontName='DejaVuSans-Bold'  # Explicitly set bold font
-    )
-
-    style_heading_center = ParagraphStyle(
-    name='HeadingCenter',
-    parent=styles['Heading1'],
-    alignment=TA_CENTER,
-    fontSize=16,
-    spaceAfter=12,
-    )
-
-    # Add a custom style for section headers (manual bold)
-    style_section_header = ParagraphStyle(
-        name='SectionHeader',
-        parent=styles['Heading2'],
-        fontName='DejaVuSans-Bold',
-        fontSize=14,
-        spaceAfter=8,
-        leading=18,
-    )
-
-    # Create a PDF document
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4, 
+def make_doc(pdf_path):
+    return SimpleDocTemplate(pdf_path, pagesize=A4,
                           leftMargin=0.5*inch, rightMargin=0.5*inch,
                           topMargin=0.5*inch, bottomMargin=0.5*inch)
+
+def generate_pdf_testing_test1(data, pdf_path):
+    doc = make_doc(pdf_path)
+    with metrics.span('layout', 'op'):
+        story = build_story(doc, data)
+    with metrics.span('build', 'op'):
+        doc.build(story)
+
+def build_story(doc, data):
+    # Flowables of the report, laid out for the frame of doc (also used by reports.py for the combined PDF)
+    # Fonts and styles are built once per process (pdf_styles)
+    pdf_styles.register_fonts()
+    style_normal = pdf_styles.NORMAL
+    style_heading2 = pdf_styles.HEADING2_NOBOLD
+    style_sheet_title = pdf_styles.OP_SHEET_TITLE
+    style_heading_center = pdf_styles.HEADING_CENTER
+    style_section_header = pdf_styles.OP_SECTION_HEADER
+
     story = []
 
     # Predefined sections
@@ -109,9 +68,9 @@ def generate_pdf_testing_test1(data, pdf_path):
 
         heading_text = f"<b>{full_name if full_name else 'Osnovni podaci'}</b>"
 
-        logo_path = os.path.join(os.path.dirname(__file__), 'static/images/akademija-logo-boja-latinica 1.png')  # <-- change if needed
+        # Shared logo, decoded once per process (pdf_styles)
         try:
-            logo = Image(logo_path, width=150, height=60)  # You can adjust size
+            logo = pdf_styles.LogoImage(width=150, height=60)
         except:
             logo = Paragraph("", style_normal)
 
@@ -122,13 +81,7 @@ def generate_pdf_testing_test1(data, pdf_path):
             [[logo, heading_title, sheet_title]],
             colWidths=[doc.width * 0.2, doc.width * 0.6, doc.width * 0.2]
         )
-        header_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-            ('ALIGN', (1, 0), (1, 0), 'CENTER'),
-            ('ALIGN', (2, 0), (2, 0), 'RIGHT'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ]))
+        header_table.setStyle(pdf_styles.HEADER_TABLE_STYLE)
         story.append(header_table)
         story.append(Spacer(1, 12))
 
@@ -162,13 +115,7 @@ def generate_pdf_testing_test1(data, pdf_path):
                     total_width = doc.width - inch
                     table = Table(data_table, 
                                   colWidths = [total_width*0.4, total_width*0.6])
-                    table.setStyle(TableStyle([
-                        ('BOX', (0,0), (-1,-1), 1, colors.black),  # Outer border
-                        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                        ('PADDING', (0,0), (-1,-1), 6),
-                        ('GRID', (0,0), (-1,-1), 1, colors.lightgrey)
-                    ]))
+                    table.setStyle(pdf_styles.OP_BASIC_TABLE_STYLE)
                     story.append(table)
 
             elif section == "Ostalo":
@@ -199,10 +146,7 @@ def generate_pdf_testing_test1(data, pdf_path):
                     
                     # Create bordered box
                     table = Table([[content_paragraphs]], colWidths=[doc.width - inch])
-                    table.setStyle(TableStyle([
-                        ('BOX', (0,0), (-1,-1), 1, colors.black),
-                        ('PADDING', (0,0), (-1,-1), 6),
-                    ]))
+                    table.setStyle(pdf_styles.BOX_TABLE_STYLE)
                     story.append(table)
             else:
                 # Two-column layout with grid between B and C
@@ -226,22 +170,17 @@ def generate_pdf_testing_test1(data, pdf_path):
                     col_b_width = col_width * 0.55
                     col_c_width = col_width * 0.45
                     table = Table(data_table, colWidths=[col_b_width, col_c_width])
-                    table.setStyle(TableStyle([
-                        ('BOX', (0,0), (-1,-1), 1, colors.black),  # Outer border
-                        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-                        ('PADDING', (0,0), (-1,-1), 6),
-                        ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),  # Grid between all cells
-                    ]))
+                    table.setStyle(pdf_styles.GRID_TABLE_STYLE)
                     story.append(table)
 
             story.append(Spacer(1, 12))
 
-    doc.build(story)
+    return story
 
-def process_excel(filepath):
+@metrics.timed('extract', 'op')
+def process_excel(source):
     try:
         sheet_names = ["Osnovni podaci"]
-        sheets = pd.read_excel(filepath, sheet_name=sheet_names, header=None)
         extracted_data = {}
         sections = [
             "Osnovni podaci",
@@ -252,35 +191,24 @@ def process_excel(filepath):
             "Ostala zaduženja",
         ]
 
-        for sheet, df in sheets.items():
+        # "Osnovni podaci" is always the first three rows, the other sections start at their name
+        other_sections_lower = [s.lower() for s in sections[1:]]
+
+        for sheet in sheet_names:
             print(f"Processing sheet: {sheet}")
-            df = df.map(lambda x: str(x).strip() if pd.notna(x) and str(x).strip() != "" else "")
-            
+            first, has_data, rows = scan_sections(source, sheet)
+            data_rows = np.flatnonzero(has_data)
+
             section_data = {section: [] for section in sections}
-            current_section = None
-            row_counter = 0
-
-            for row in df.values.tolist():
-                row_cells = [cell for cell in row if cell]
-                if not row_cells:
-                    continue
-
-                # FIRST 3 ROWS = "Osnovni podaci"
-                if row_counter < 3:
-                    cols = tuple(row[i] if i < len(row) else "" for i in range(1, 5))  # Columns B-E
-                    section_data["Osnovni podaci"].append(cols)
-                    row_counter += 1
-                    continue
-
-                # Process remaining rows normally
-                first_cell = row_cells[0].lower()
-                if first_cell in [s.lower() for s in sections[1:]]:  # Skip "Osnovni podaci"
-                    current_section = sections[[s.lower() for s in sections].index(first_cell)]
-                    continue
-
-                if current_section:
-                    cols = tuple(row[i] if i < len(row) else "" for i in range(1, 5))
-                    section_data[current_section].append(cols)
+            # FIRST 3 ROWS = "Osnovni podaci" (columns B-E)
+            section_data["Osnovni podaci"] = [rows[i] for i in data_rows[:3]]
+
+            # Remaining rows: columns B-E of the non-empty rows up to the next section name
+            remaining = data_rows[3:]
+            boundaries = np.flatnonzero(np.isin(first[remaining], other_sections_lower)).tolist()
+            for start, end in zip(boundaries, boundaries[1:] + [len(remaining)]):
+                section = sections[1 + other_sections_lower.index(first[remaining[start]])]
+                section_data[section].extend(rows[i] for i in remaining[start + 1:end])
 
             extracted_data[sheet] = section_data
 
@@ -291,6 +219,24 @@ def process_excel(filepath):
         traceback.print_exc()
         return None
 
+def get_professor_name_from_data(extracted_data):
+    # Get professor name from the first sheet's data
+    first_sheet_data = next(iter(extracted_data.values()))
+    name_data = {"first_name": "", "last_name": ""}
+
+    # Extract professor's name from "Osnovni podaci" section
+    for row in first_sheet_data.get("Osnovni podaci", []):
+        if len(row) > 1:  # Ensure row has both label and value
+            label = str(row[0]).strip().lower()
+            value = str(row[1]).strip()
+
+            if "ime" in label and not name_data["first_name"]:
+                name_data["first_name"] = value
+            elif "prezime" in label and not name_data["last_name"]:
+                name_data["last_name"] = value
+
+    return f"{name_data['first_name']} {name_data['last_name']}".strip()
+
 if __name__ == "__main__":
     # File processing
     filepath = "Novi_Izveštaj o radu_za_Nastavnike_Natasa_Bogdanovic.xlsx"
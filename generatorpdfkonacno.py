@@ -1,85 +1,69 @@
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Spacer, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import pdfmetrics
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.platypus import SimpleDocTemplate, Table, Spacer, Paragraph
+import io
 import os
+import time
+from functools import lru_cache
 import cyrtranslit
-
-font_path_regular = os.path.join(os.path.dirname(__file__), 'fonts', 'micross-regular.ttf')
-pdfmetrics.registerFont(TTFont('Microsoft Sans Serif', font_path_regular))
-
-font_path_bold = os.path.join(os.path.dirname(__file__), 'fonts', 'arial-bold.ttf')
-pdfmetrics.registerFont(TTFont('Microsoft Sans Serif Bold', font_path_bold))
-
-font_path_italic = os.path.join(os.path.dirname(__file__), 'fonts', 'arial-corsivo-2.ttf')
-pdfmetrics.registerFont(TTFont('Microsoft Sans Serif Italic', font_path_italic))
-
+import pdf_styles
+import metrics
+import opterecenje_canvas
+
+# 'canvas' draws the report straight on the canvas (opterecenje_canvas), 'platypus' lays it out with
+# platypus tables; both give the same page
+OPTERECENJE_RENDERER = os.environ.get('OPTERECENJE_RENDERER', 'canvas')
+
+# Columns of the department workbook that go into the Opterećenje PDF
+OPTERECENJE_COLUMNS = [
+    "Ime Predavača",
+    "Naziv Predmeta",
+    "Pozicija",
+    "Tip Predavanja",
+    "Nedeljni Broj Časova",
+    "Broj Grupa",
+    "Tip studija",
+    "Odsek",
+    "Ukupno casova"
+]
+
+def init_worker():
+    # Initializer for the batch process pool (app.procesiranjesvih), every worker loads the fonts once,
+    # before it renders its first professor.
+    pdf_styles.register_fonts()
+
+def generate_pdf_bytes(dataframe):
+    # Same as generate_pdf, but the PDF is kept in memory and returned (used by the batch process pool)
+    buffer = io.BytesIO()
+    generate_pdf(dataframe, buffer)
+    return buffer.getvalue()
+
+# Transliterated strings are kept per process, so the batch workers reuse them for every professor
+# (subjects, programs, "predavanja"/"vežbe", "osnovne"/"master" repeat across the whole department)
+TRANSLITERATION_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=TRANSLITERATION_CACHE_SIZE)
 def to_cyrilic(text):
     return cyrtranslit.to_cyrillic(text, "sr")
 
-def generate_pdf(dataframe, filename):
-
-    dataframe.rename(columns={"Ukupno casova": "Norma časova"}, inplace=True)
-    dataframe.rename(columns={"Naziv Predmeta": "Naziv predmeta"}, inplace=True)
-    dataframe.rename(columns={"Nedeljni Broj Časova": "Nedeljni broj časova"}, inplace=True)
-    dataframe.rename(columns={"Broj Grupa": "Broj grupa"}, inplace=True)
-    dataframe.rename(columns={"Tip Predavanja": "Tip predavanja"}, inplace=True)
-
-    doc = SimpleDocTemplate(filename, pagesize=A4)
-    elements = []
-    spacer = Spacer(0, 0)
-    spacer1 = Spacer(0, 10)
-    styles = getSampleStyleSheet()
-
-    # Definisanje fonta
-    title_style = styles["BodyText"]
-    title_style.fontName = "Microsoft Sans Serif"
-
-    
-    bold_style = styles["BodyText"]
-    bold_style.fontName = "Microsoft Sans Serif"
-
-    bold_style_header = styles["BodyText"]
-    bold_style_header.fontName = "Microsoft Sans Serif"
-    bold_style_header.alignment = TA_CENTER
-
-    styles = {
-        "HeaderStyle": ParagraphStyle(
-            name="HeaderStyle",
-            fontName="Microsoft Sans Serif",
-            fontSize=10,
-            alignment=TA_CENTER, 
-            textColor="black",
-        ),
-        "BodyText": ParagraphStyle(
-            name="BodyText",
-            fontName="Microsoft Sans Serif",
-            fontSize=10,
-            textColor="black",
-        ),
-        "BodyTextBold": ParagraphStyle(
-            name="BodyTextBold",
-            fontName="Microsoft Sans Serif Bold",
-            fontSize=10,
-            textColor="black",
-        ),
-        "BodyTextItalic": ParagraphStyle(
-            name="BodyTextItalic",
-            fontName="Microsoft Sans Serif Italic",
-            fontSize=10,
-            textColor="black",
-        ),
-        "TitleStyle": ParagraphStyle(
-            name="SpecialCell",
-            fontName="Microsoft Sans Serif",
-            fontSize=18,
-            alignment=TA_LEFT,
-            textColor="black",
-        ),
-    }
+def to_cyrilic_rows(rows):
+    # str() of every cell of rows, transliterated; every distinct value of a column is transliterated once
+    columns = []
+    for column in zip(*rows):
+        texts = [str(cell) for cell in column]
+        transliterated = {text: to_cyrilic(text) for text in set(texts)}
+        columns.append([transliterated[text] for text in texts])
+    return [list(row) for row in zip(*columns)]
+
+def prepare_content(dataframe):
+    # Everything the report shows, transliterated; the same for both renderers
+    # Not in place: the caller's frame can be shared (cached department partition)
+    dataframe = dataframe.rename(columns={
+        "Ukupno casova": "Norma časova",
+        "Naziv Predmeta": "Naziv predmeta",
+        "Nedeljni Broj Časova": "Nedeljni broj časova",
+        "Broj Grupa": "Broj grupa",
+        "Tip Predavanja": "Tip predavanja",
+    })
 
     # Izdvajanje Imena profesora i Pozicije
     professor_name = dataframe.iloc[0]["Ime Predavača"] 
@@ -93,61 +77,82 @@ def generate_pdf(dataframe, filename):
     else:
         position_text = "Pozicija Nepoznata"
 
-    title_text = f"{position_text} {professor_name}"
-
     columns_to_exclude = ["Pozicija", "Ime Predavača"]
 
     filtered_dataframe = dataframe.drop(columns = columns_to_exclude)
+    values = filtered_dataframe.values
+
+    # Odvajamo redove u osnovne i master
+    osnovne = (dataframe['Tip studija'] == 'osnovne').values
+    master = (dataframe['Tip studija'] == 'master').values
+
+    return {
+        # The name on its own, so it is transliterated once per process like the table cells
+        'title': f"{to_cyrilic(position_text)} {to_cyrilic(str(professor_name))}",
+        'columns': [to_cyrilic(col) for col in filtered_dataframe.columns.tolist()],
+        'osnovne': to_cyrilic_rows(values[osnovne]),
+        'master': to_cyrilic_rows(values[master]),
+        # Sumiranje ukupnog "Opterećenje" za osnovne i master
+        'osnovne_total': dataframe["Norma časova"][osnovne].sum() if osnovne.any() else None,
+        'master_total': dataframe["Norma časova"][master].sum() if master.any() else None,
+        'total': dataframe["Norma časova"].sum() if "Norma časova" in dataframe.columns else None,
+    }
+
+def generate_pdf(dataframe, filename):
+    layout_start = time.perf_counter()
+    content = prepare_content(dataframe)
+
+    # The seven-column grid is drawn straight on the canvas (opterecenje_canvas), any other layout
+    # of the department sheet goes through the platypus tables below
+    if OPTERECENJE_RENDERER == 'canvas' and len(content['columns']) == len(opterecenje_canvas.COLUMN_WIDTHS):
+        pages = opterecenje_canvas.layout(content)
+        metrics.observe('layout', time.perf_counter() - layout_start, 'opterecenje')
+        with metrics.span('build', 'opterecenje'):
+            opterecenje_canvas.draw(pages, filename)
+        return
+
+    doc = SimpleDocTemplate(filename, pagesize=A4)
+    elements = []
+    spacer = Spacer(0, 0)
+
+    # Definisanje fonta (fontovi i stilovi se prave jednom po procesu, pdf_styles)
+    pdf_styles.register_fonts()
+    bold_style_header = pdf_styles.OPT_COLUMN_HEADER
+
+    styles = {
+        "BodyText": pdf_styles.OPT_BODY,
+        "BodyTextBold": pdf_styles.OPT_BODY_BOLD,
+        "BodyTextItalic": pdf_styles.OPT_BODY_ITALIC,
+        "TitleStyle": pdf_styles.OPT_TITLE,
+    }
 
     title_table = Table(
-    [[Paragraph(to_cyrilic((title_text)), styles["TitleStyle"])]],
+    [[Paragraph(content['title'], styles["TitleStyle"])]],
     colWidths=[580]  # Set the width to match the table's starting point
     )
-    title_table.setStyle(
-        TableStyle([
-            ("ALIGN", (0, 0), (-1, -1), "LEFT"),  # Align left
-            ("FONTNAME", (0, 0), (-1, -1), "Microsoft Sans Serif"),
-            ("FONTSIZE", (0, 0), (-1, -1), 14),  # Adjust font size as needed
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 10),  # Add space below the text
-        ])
-    )
+    title_table.setStyle(pdf_styles.OPT_TITLE_TABLE_STYLE)
     elements.append(title_table)
     elements.append(Spacer(0, 10))
 
-    # Odvajamo df u osnovne i master
-    osnovne_data = dataframe[dataframe['Tip studija'] == 'osnovne']
-    master_data = dataframe[dataframe['Tip studija'] == 'master']
-
     # Izdvajanje imena kolona i wrapped text feature
-    columns = filtered_dataframe.columns.tolist()
-    columns_wrapped = [Paragraph(to_cyrilic(col), bold_style_header) for col in columns]
+    columns_wrapped = [Paragraph(col, bold_style_header) for col in content['columns']]
     columns_wrapped = [columns_wrapped]
 
     #Konvertovanje redova u Paragraphs za word wrapping
-    # data_wrapped_osnovne = [
-    #     [Paragraph(to_cyrilic(str(cell)), styles["BodyText"]) for cell in row]
-    #     for row in osnovne_data.drop(columns = columns_to_exclude).values
-    # ]
-
     data_wrapped_osnovne = [
     [
-        Paragraph(to_cyrilic(str(cell)), styles["BodyTextBold"] if idx == 0 else styles["BodyText"])
-        for idx, cell in enumerate(row)
+        Paragraph(text, styles["BodyTextBold"] if idx == 0 else styles["BodyText"])
+        for idx, text in enumerate(row)
     ]
-    for row in osnovne_data.drop(columns=columns_to_exclude).values
+    for row in content['osnovne']
     ]
 
-    # data_wrapped_master = [
-    #     [Paragraph(to_cyrilic(str(cell)), styles["BodyText"]) for cell in row]
-    #     for row in master_data.drop(columns = columns_to_exclude).values
-    # ]
-
     data_wrapped_master = [
     [
-        Paragraph(to_cyrilic(str(cell)), styles["BodyTextBold"] if idx == 0 else styles["BodyText"])
-        for idx, cell in enumerate(row)
+        Paragraph(text, styles["BodyTextBold"] if idx == 0 else styles["BodyText"])
+        for idx, text in enumerate(row)
     ]
-    for row in master_data.drop(columns=columns_to_exclude).values
+    for row in content['master']
     ]
 
     # Kombinovanje header-a i podataka
@@ -156,134 +161,57 @@ def generate_pdf(dataframe, filename):
     table_data_master = data_wrapped_master
 
     column_table = Table(columns_wrapped, colWidths=[180, 90, 80, 50, 80, 50, 50])
-    column_table.setStyle(
-        TableStyle(
-            [
-                    ("ALIGN", (0, 0), (-1, 0), "CENTER"),
-                    ("VALIGN", (0, 0), (-1, 0), "MIDDLE"),
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.white),  # Header background
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
-                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-            ]
-        )
-    )
+    column_table.setStyle(pdf_styles.OPT_COLUMN_TABLE_STYLE)
 
     elements.append(column_table)
     elements.append(spacer)
 
     # Kreiranje glavne tabele
-    if not osnovne_data.empty:
+    if content['osnovne']:
         table = Table(table_data_osnovne, colWidths=[180, 90, 80, 50, 80, 50, 50])
-        table.setStyle(
-            TableStyle(
-                [
-                    # Header Row: Center horizontally and vertically
-                    ("ALIGN", (0, 0), (-1, 0), "CENTER"),
-                    ("VALIGN", (0, 0), (-1, 0), "BOTTOM"),
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.white),  # Header background
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),  # Header text color
-
-                    # Data Rows: Left-align horizontally, center vertically
-                    ("ALIGN", (0, 1), (-1, -1), "LEFT"),
-                    ("VALIGN", (0, 1), (-1, -1), "BOTTOM"),
-                    ("BACKGROUND", (0, 1), (-1, -1), colors.white),
-                    ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
-
-                    # Grid lines for the whole table
-                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                ]
-            )
-        )
+        table.setStyle(pdf_styles.OPT_OSNOVNE_TABLE_STYLE)
         elements.append(table)
         elements.append(spacer)
 
-        # Sumiranje ukupnog "Opterećenje" za osnovne
-        total_load_osnovne = osnovne_data["Norma časova"].sum()
-
         # Tabela sum Opterećenja za osnovne
         summary_table_osnovne = Table(
             [
-                ["Оптерећење на основним студијама", f"{total_load_osnovne:.2f}"]
+                ["Оптерећење на основним студијама", f"{content['osnovne_total']:.2f}"]
             ],
             colWidths=[530, 50]
         )
-        summary_table_osnovne.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.lightblue),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
-                    ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
-                    ("FONTNAME", (0, 0), (0, 0), "Microsoft Sans Serif Italic"),
-                    ("FONTNAME", (0, 1), (-1, -1), "Microsoft Sans Serif"),
-                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                ]
-            )
-        )
+        summary_table_osnovne.setStyle(pdf_styles.OPT_SUMMARY_OSNOVNE_TABLE_STYLE)
         elements.append(summary_table_osnovne)
         elements.append(spacer)
-    if not master_data.empty:
+    if content['master']:
         elements.append(column_table)
 
     #Proverava da li profesor ima podatke sa master studija, ako nema ne generiše se tabela sa master predmetima
-    if not master_data.empty:
+    if content['master']:
         # Kreiranje glavne mater tabele
         table = Table(table_data_master, colWidths=[180, 90, 80, 50, 80, 50, 50])
-        table.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.white),  # Header background color
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),  # Header text color
-                    ("ALIGN", (0, 0), (-1, 0), "CENTER"),  # Center align column headers horizontally
-                    ("VALIGN", (0, 0), (-1, 0), "MIDDLE"),  # Center align column headers vertically
-                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                ]
-            )
-        )
+        table.setStyle(pdf_styles.OPT_MASTER_TABLE_STYLE)
         elements.append(table)
         elements.append(spacer)
 
-        # Računanje "Opterećenje" za master
-        total_load_master = master_data["Norma časova"].sum()
-
         # Sumuiranje ukupnog Opterećenja za master
         summary_table_master = Table(
             [
-                ["Оптерећење на мастер студијама", f"{total_load_master:.2f}"]
+                ["Оптерећење на мастер студијама", f"{content['master_total']:.2f}"]
             ],
             colWidths=[530, 50]
         )
-        summary_table_master.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.lightcoral),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
-                    ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
-                    ("FONTNAME", (0, 0), (0, 0), "Microsoft Sans Serif Italic"),
-                    ("FONTNAME", (0, 1), (-1, -1), "Microsoft Sans Serif"),
-                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                ]
-            )
-        )
+        summary_table_master.setStyle(pdf_styles.OPT_SUMMARY_MASTER_TABLE_STYLE)
         elements.append(summary_table_master)
         elements.append(spacer)
 
     # Sumiranje ukupnog Opterećenja
-    if "Norma časova" in dataframe.columns:
-        total_load = dataframe["Norma časova"].sum()
-        total_table = Table([["Укупно оптерећење", total_load]], colWidths=[530, 50])
-        total_table.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.lightgreen),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
-                    ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
-                    ("FONTNAME", (0, 0), (0, 0), "Microsoft Sans Serif Bold"),
-                    ("FONTNAME", (0, 0), (-1, 0), "Microsoft Sans Serif Bold"),
-                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                ]
-            )
-        )
+    if content['total'] is not None:
+        total_table = Table([["Укупно оптерећење", content['total']]], colWidths=[530, 50])
+        total_table.setStyle(pdf_styles.OPT_TOTAL_TABLE_STYLE)
         elements.append(total_table)
 
     # Bulid-ovanje PDF-a
-    doc.build(elements)
+    metrics.observe('layout', time.perf_counter() - layout_start, 'opterecenje')
+    with metrics.span('build', 'opterecenje'):
+        doc.build(elements)
@@ -0,0 +1,91 @@
+import time
+import threading
+import functools
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Time spent in every stage of a request, aggregated in this process into one histogram per
+# (stage, label) and published on /metrics. The stages are upload, parse, extract, layout (building
+# the platypus story), build (doc.build), send and request (whole request incl. sending the response),
+# job (batch jobs). The label is the report type, or the endpoint for upload / send / request.
+# Work done inside the batch worker processes is only seen through the job span.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+histograms = {}
+histograms_lock = threading.Lock()
+
+def observe(stage, seconds, label=''):
+    with histograms_lock:
+        histogram = histograms.get((stage, label))
+        if histogram is None:
+            # counts[i] is the number of observations in (BUCKETS[i - 1], BUCKETS[i]], the last one is +Inf
+            histogram = histograms[(stage, label)] = {'counts': [0] * (len(BUCKETS) + 1), 'count': 0, 'sum': 0.0, 'max': 0.0}
+        histogram['counts'][bisect_left(BUCKETS, seconds)] += 1
+        histogram['count'] += 1
+        histogram['sum'] += seconds
+        histogram['max'] = max(histogram['max'], seconds)
+
+@contextmanager
+def span(stage, label=''):
+    # Times the with block; it is recorded even if the block raises
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start, label)
+
+def timed(stage, label=''):
+    # span() as a decorator
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(stage, label):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def quantile(counts, count, q):
+    # Upper bound of the bucket the q-th observation falls in (None if it is past the last bucket)
+    rank = q * count
+    seen = 0
+    for bound, bucket_count in zip(BUCKETS, counts):
+        seen += bucket_count
+        if seen >= rank:
+            return bound
+    return None
+
+def snapshot():
+    # Copy of every histogram, ready for JSON
+    with histograms_lock:
+        items = sorted((key, dict(histogram, counts=list(histogram['counts']))) for key, histogram in histograms.items())
+    result = []
+    for (stage, label), histogram in items:
+        count = histogram['count']
+        result.append({
+            'stage': stage,
+            'label': label,
+            'count': count,
+            'sum': round(histogram['sum'], 6),
+            'mean': round(histogram['sum'] / count, 6),
+            'max': round(histogram['max'], 6),
+            'p50': quantile(histogram['counts'], count, 0.5),
+            'p95': quantile(histogram['counts'], count, 0.95),
+            'buckets': dict(zip([str(bound) for bound in BUCKETS] + ['+Inf'], histogram['counts'])),
+        })
+    return result
+
+def render_text():
+    # Prometheus text format, so a local scraper (or curl) can read it; buckets are cumulative there
+    lines = [
+        "# HELP stage_duration_seconds Time spent in each stage of request handling.",
+        "# TYPE stage_duration_seconds histogram",
+    ]
+    for entry in snapshot():
+        labels = f'stage="{entry["stage"]}",label="{entry["label"]}"'
+        cumulative = 0
+        for bound, bucket_count in entry['buckets'].items():
+            cumulative += bucket_count
+            lines.append(f'stage_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'stage_duration_seconds_sum{{{labels}}} {entry["sum"]}')
+        lines.append(f'stage_duration_seconds_count{{{labels}}} {entry["count"]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,182 @@
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import getAscent
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Paragraph
+import pdf_styles
+from column_sizing import text_width
+
+# The Opterećenje report drawn straight on the canvas. It is the same fixed grid generatorpdfkonacno builds
+# out of platypus tables, drawn at the same positions, but without a Paragraph and a Table for every cell:
+# a cell that fits on one line is drawn as a string, only the cells that don't are wrapped (with the same
+# Paragraph as before). Pages are split between rows the way platypus splits the tables.
+PAGE_WIDTH, PAGE_HEIGHT = A4
+# SimpleDocTemplate's frame: 1 inch margins and 6pt padding
+FRAME_PADDING = 6
+FRAME_TOP = PAGE_HEIGHT - inch - FRAME_PADDING
+FRAME_BOTTOM = inch + FRAME_PADDING
+FRAME_WIDTH = PAGE_WIDTH - 2 * inch - 2 * FRAME_PADDING
+COLUMN_WIDTHS = [180, 90, 80, 50, 80, 50, 50]
+SUMMARY_WIDTHS = [530, 50]
+TABLE_WIDTH = sum(COLUMN_WIDTHS)
+# The tables are wider than the frame and centred on it, like platypus does
+TABLE_X = inch + FRAME_PADDING + (FRAME_WIDTH - TABLE_WIDTH) / 2
+TITLE_SPACE = 10
+
+# Table cell defaults (and BOTTOMPADDING of the title)
+LEFT_PADDING = RIGHT_PADDING = 6
+TOP_PADDING = BOTTOM_PADDING = 3
+TITLE_BOTTOM_PADDING = 10
+# Summary rows are plain strings in the default cell font size and leading
+SUMMARY_FONT_SIZE = 10
+SUMMARY_LEADING = 12
+SUMMARY_HEIGHT = SUMMARY_LEADING + TOP_PADDING + BOTTOM_PADDING
+# Texts this close to the width of their cell are wrapped by Paragraph, which decides how they break
+FIT_MARGIN = 0.01
+
+def is_plain(text):
+    # Paragraph parses markup and collapses whitespace, these texts come out of it unchanged
+    return bool(text) and '<' not in text and '&' not in text and text == ' '.join(text.split())
+
+def measure_cell(text, style, width):
+    # (height, item): item is drawn at the left edge of the cell, dy above the bottom of the text block
+    available = width - LEFT_PADDING - RIGHT_PADDING
+    if is_plain(text):
+        line_width = text_width(text, style.fontName, style.fontSize)
+        if line_width < available - FIT_MARGIN:
+            dx = LEFT_PADDING + ((available - line_width) / 2 if style.alignment == TA_CENTER else 0)
+            # Paragraph puts the first baseline fontSize (or the font's ascent) below its top
+            ascent = style.fontSize if rl_config.paraFontSizeHeightOffset else getAscent(style.fontName, style.fontSize)
+            return style.leading, ('line', dx, style.leading - ascent, text, style.fontName, style.fontSize)
+    paragraph = Paragraph(text, style)
+    return paragraph.wrap(available, PAGE_HEIGHT)[1], ('paragraph', LEFT_PADDING, 0, paragraph)
+
+def grid_row(texts, styles, widths, valign='BOTTOM', bottom_padding=BOTTOM_PADDING):
+    # (height, background, cells) of a row of wrapped text cells; cell positions are relative to the
+    # bottom left corner of the row
+    measured = [measure_cell(text, style, width) for text, style, width in zip(texts, styles, widths)]
+    height = max(cell_height for cell_height, _ in measured) + TOP_PADDING + bottom_padding
+    cells = []
+    x = 0
+    for width, (cell_height, (kind, dx, dy, *item)) in zip(widths, measured):
+        if valign == 'MIDDLE':
+            bottom = (height + bottom_padding - TOP_PADDING - cell_height) / 2
+        else:
+            bottom = bottom_padding
+        cells.append((kind, x + dx, bottom + dy, *item))
+        x += width
+    return height, None, cells
+
+def summary_row(texts, font_names, background):
+    # A row of right aligned strings over the summary columns
+    cells = []
+    x = 0
+    for text, font_name, width in zip(texts, font_names, SUMMARY_WIDTHS):
+        x += width
+        cells.append(('line', x - RIGHT_PADDING - text_width(text, font_name, SUMMARY_FONT_SIZE),
+                      BOTTOM_PADDING + SUMMARY_LEADING - SUMMARY_FONT_SIZE, text, font_name, SUMMARY_FONT_SIZE))
+    return SUMMARY_HEIGHT, background, cells
+
+def layout(content):
+    # Pages of [(top, rows, column widths or None)], every table (or the part of it on that page) with
+    # the y of its top edge. content comes from generatorpdfkonacno.prepare_content.
+    pdf_styles.register_fonts()
+    body_styles = [pdf_styles.OPT_BODY_BOLD] + [pdf_styles.OPT_BODY] * (len(COLUMN_WIDTHS) - 1)
+    header = grid_row(content['columns'], [pdf_styles.OPT_COLUMN_HEADER] * len(COLUMN_WIDTHS), COLUMN_WIDTHS, valign='MIDDLE')
+
+    blocks = [
+        ([grid_row([content['title']], [pdf_styles.OPT_TITLE], [TABLE_WIDTH], bottom_padding=TITLE_BOTTOM_PADDING)], None),
+        TITLE_SPACE,
+        ([header], COLUMN_WIDTHS),
+    ]
+    if content['osnovne']:
+        blocks.append(([grid_row(row, body_styles, COLUMN_WIDTHS) for row in content['osnovne']], COLUMN_WIDTHS))
+        blocks.append(([summary_row(["Оптерећење на основним студијама", f"{content['osnovne_total']:.2f}"],
+                                    ['Microsoft Sans Serif Italic', 'Helvetica'], colors.lightblue)], SUMMARY_WIDTHS))
+    if content['master']:
+        blocks.append(([header], COLUMN_WIDTHS))
+        # The first row of the master table is centred vertically (OPT_MASTER_TABLE_STYLE)
+        blocks.append(([grid_row(row, body_styles, COLUMN_WIDTHS, valign='MIDDLE' if i == 0 else 'BOTTOM')
+                        for i, row in enumerate(content['master'])], COLUMN_WIDTHS))
+        blocks.append(([summary_row(["Оптерећење на мастер студијама", f"{content['master_total']:.2f}"],
+                                    ['Microsoft Sans Serif Italic', 'Helvetica'], colors.lightcoral)], SUMMARY_WIDTHS))
+    if content['total'] is not None:
+        blocks.append(([summary_row(["Укупно оптерећење", str(content['total'])],
+                                    ['Microsoft Sans Serif Bold', 'Microsoft Sans Serif Bold'], colors.lightgreen)], SUMMARY_WIDTHS))
+
+    pages = [[]]
+    y = FRAME_TOP
+    for block in blocks:
+        if not isinstance(block, tuple):
+            # Spacer
+            y -= block
+            continue
+        rows, widths = block
+        while rows:
+            available = y - FRAME_BOTTOM
+            height = sum(row[0] for row in rows)
+            if y - height >= FRAME_BOTTOM - rl_config._FUZZ:
+                pages[-1].append((y, rows, widths))
+                y -= height
+                break
+            # Split after the last row that fits, the rest goes on the next page
+            used = fitting = 0
+            for row in rows:
+                if used + row[0] > available:
+                    break
+                used += row[0]
+                fitting += 1
+            if not fitting and not pages[-1]:
+                # A row higher than a whole page is drawn anyway
+                fitting = 1
+            if fitting:
+                pages[-1].append((y, rows[:fitting], widths))
+                rows = rows[fitting:]
+            pages.append([])
+            y = FRAME_TOP
+    return [page for page in pages if page]
+
+def draw(pages, filename):
+    canvas = Canvas(filename, pagesize=A4)
+    for page in pages:
+        text = canvas.beginText()
+        font = None
+        lines = []
+        for top, rows, widths in page:
+            y = top
+            row_edges = [top]
+            for height, background, cells in rows:
+                y -= height
+                row_edges.append(y)
+                if background is not None:
+                    canvas.setFillColor(background)
+                    canvas.rect(TABLE_X, y, TABLE_WIDTH, height, stroke=0, fill=1)
+                for kind, dx, dy, *item in cells:
+                    if kind == 'paragraph':
+                        item[0].drawOn(canvas, TABLE_X + dx, y + dy)
+                        continue
+                    line, font_name, font_size = item
+                    if font != (font_name, font_size):
+                        font = (font_name, font_size)
+                        text.setFont(font_name, font_size)
+                    text.setTextOrigin(TABLE_X + dx, y + dy)
+                    text.textOut(line)
+            if widths is not None:
+                # Grid: every row and column boundary of this part of the table
+                lines.extend((TABLE_X, edge, TABLE_X + TABLE_WIDTH, edge) for edge in row_edges)
+                x = TABLE_X
+                for width in [0] + widths:
+                    x += width
+                    lines.append((x, y, x, top))
+        canvas.setFillColor(colors.black)
+        canvas.drawText(text)
+        canvas.setStrokeColor(colors.black)
+        canvas.setLineWidth(1)
+        canvas.setLineCap(1)
+        canvas.setLineJoin(1)
+        canvas.lines(lines)
+        canvas.showPage()
+    canvas.save()
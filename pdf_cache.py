@@ -0,0 +1,134 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from importlib.metadata import version, PackageNotFoundError
+
+# Finished PDFs on disk, keyed by (workbook content hash, report type, sheet / professor, generator version).
+# A hit is served from the file alone, without pandas or reportlab.
+PDF_CACHE_FOLDER = os.environ.get('PDF_CACHE_FOLDER', 'pdf_cache')
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_MB', 512)) * 1024 * 1024
+ENTRY_SUFFIX = '.pdfcache'
+
+# Packages whose version changes the PDFs: reportlab draws them, pandas, openpyxl and xlrd (.xls, optional)
+# decide the values read from the workbooks, cyrtranslit the Cyrillic text
+GENERATOR_PACKAGES = ["reportlab", "pandas", "openpyxl", "xlrd", "cyrtranslit"]
+
+# Everything that decides how a report looks. Editing any of these files (or upgrading GENERATOR_PACKAGES)
+# changes the generator version, so PDFs made by older code are never served again. app.py is left
+# out on purpose: routes and logging don't change the PDF bytes, and what app.py hands the generators
+# (e.g. generatorpdfkonacno.OPTERECENJE_COLUMNS) lives in these files.
+GENERATOR_SOURCES = [
+    "workbook_utils.py",
+    "pdf_styles.py",
+    "generate_pdf_testing_AN.py",
+    "generate_pdf_testing_EDN.py",
+    "generate_pdf_izvestaj_o_radu_konacno.py",
+    "generate_pdf_testing_OP.py",
+    "generatorpdfkonacno.py",
+    "opterecenje_canvas.py",
+    "column_sizing.py",
+    "reports.py",
+]
+
+cache_lock = threading.Lock()
+# file name -> size in bytes, least recently used first. Built from the folder on first use.
+cache_index = None
+generator_version_hash = None
+
+def generator_version():
+    global generator_version_hash
+    if generator_version_hash is None:
+        digest = hashlib.sha256()
+        for package in GENERATOR_PACKAGES:
+            try:
+                package_version = version(package)
+            except PackageNotFoundError:
+                package_version = ''
+            digest.update(f"{package}=={package_version}\n".encode('utf-8'))
+        # The Opterećenje renderer (generatorpdfkonacno.OPTERECENJE_RENDERER)
+        digest.update(os.environ.get('OPTERECENJE_RENDERER', '').encode('utf-8'))
+        for source in GENERATOR_SOURCES:
+            with open(os.path.join(os.path.dirname(__file__), source), 'rb') as f:
+                digest.update(f.read())
+        generator_version_hash = digest.hexdigest()
+    return generator_version_hash
+
+def make_key(data_hash, report_type, variant=''):
+    parts = [data_hash, report_type, variant or '', generator_version()]
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+def entry_path(name):
+    return os.path.join(PDF_CACHE_FOLDER, name)
+
+def load_index():
+    # Called with cache_lock held. File modification times keep the LRU order across restarts.
+    global cache_index
+    if cache_index is None:
+        os.makedirs(PDF_CACHE_FOLDER, exist_ok=True)
+        entries = []
+        for entry in os.scandir(PDF_CACHE_FOLDER):
+            if entry.name.endswith(ENTRY_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+            elif entry.name.endswith('.tmp'):
+                # Left over from a write that never finished
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+        cache_index = OrderedDict((name, size) for _, name, size in sorted(entries))
+    return cache_index
+
+def get(key):
+    # Returns (pdf_bytes, meta) or None
+    name = key + ENTRY_SUFFIX
+    with cache_lock:
+        index = load_index()
+        if name not in index:
+            return None
+        index.move_to_end(name)
+    try:
+        with open(entry_path(name), 'rb') as f:
+            meta = json.loads(f.readline())
+            pdf = f.read()
+        os.utime(entry_path(name))
+    except (OSError, ValueError) as e:
+        # Evicted by another request in the meantime, or a damaged file
+        print(f"PDF cache entry {name} could not be read: {e}")
+        with cache_lock:
+            index.pop(name, None)
+        return None
+    return pdf, meta
+
+def put(key, pdf, meta=None):
+    # The entry is one file: a JSON line with the metadata (e.g. professor name) followed by the PDF.
+    # It is written under a temporary name and renamed, so a reader never sees half of it.
+    name = key + ENTRY_SUFFIX
+    header = json.dumps(meta or {}).encode('utf-8') + b'\n'
+    with cache_lock:
+        load_index()
+    tmp_path = f"{entry_path(name)}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(pdf)
+        os.replace(tmp_path, entry_path(name))
+    except OSError as e:
+        print(f"Could not write PDF cache entry {name}: {e}")
+        return
+
+    with cache_lock:
+        index = load_index()
+        index[name] = len(header) + len(pdf)
+        index.move_to_end(name)
+        # Evict least recently used entries until we are back under the quota
+        total_size = sum(index.values())
+        while index and total_size > PDF_CACHE_MAX_BYTES:
+            evicted, evicted_size = index.popitem(last=False)
+            total_size -= evicted_size
+            try:
+                os.remove(entry_path(evicted))
+            except OSError:
+                pass
@@ -0,0 +1,288 @@
+import os
+import threading
+from functools import lru_cache
+from PIL import Image as PILImage
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Image, TableStyle
+from reportlab.platypus.flowables import Flowable
+
+# Fonts used by the report generators. DejaVu is used by the workbook reports (AN, EDN, OP, izvestaj),
+# "Microsoft Sans Serif" by the Opterecenje report (generatorpdfkonacno).
+FONT_FILES = {
+    'DejaVuSans': os.path.join(os.path.dirname(__file__), 'static/fonts', 'DejaVuSans.ttf'),
+    'DejaVuSans-Bold': os.path.join(os.path.dirname(__file__), 'static/fonts', 'DejaVuSans-Bold.ttf'),
+    'Microsoft Sans Serif': os.path.join(os.path.dirname(__file__), 'fonts', 'micross-regular.ttf'),
+    'Microsoft Sans Serif Bold': os.path.join(os.path.dirname(__file__), 'fonts', 'arial-bold.ttf'),
+    'Microsoft Sans Serif Italic': os.path.join(os.path.dirname(__file__), 'fonts', 'arial-corsivo-2.ttf'),
+}
+
+fonts_lock = threading.Lock()
+
+def register_fonts():
+    # Every TTF is parsed once per process, later calls are a dictionary lookup
+    if set(FONT_FILES) <= set(pdfmetrics.getRegisteredFontNames()):
+        return
+    with fonts_lock:
+        for name, path in FONT_FILES.items():
+            if name not in pdfmetrics.getRegisteredFontNames():
+                pdfmetrics.registerFont(TTFont(name, path))
+
+LOGO_PATH = os.path.join(os.path.dirname(__file__), 'static/images/akademija-logo-boja-latinica 1.png')
+LOGO_WIDTH, LOGO_HEIGHT = 150, 60
+# The source PNG is 5000x2000 RGBA, far more than the 150x60pt it is printed at
+LOGO_DPI = 300
+
+@lru_cache(maxsize=None)
+def logo_reader(width, height):
+    # Decoded once per process (and printed size): scaled down to LOGO_DPI and flattened onto the white
+    # page background, so every PDF embeds one small RGB image instead of the full RGBA one.
+    with PILImage.open(LOGO_PATH) as source:
+        source = source.convert('RGBA')
+    size = (round(width * LOGO_DPI / 72), round(height * LOGO_DPI / 72))
+    scaled = source.resize(size, PILImage.LANCZOS)
+    logo = PILImage.new('RGB', size, 'white')
+    logo.paste(scaled, mask=scaled.getchannel('A'))
+    reader = ImageReader(logo)
+    reader.getRGBData()
+    return reader
+
+class LogoImage(Image):
+    # A flowable keeps its own layout state, so every header gets a new one, but they all draw the same
+    # decoded image. The canvas names images by content, so the logo is stored once per PDF.
+    def __init__(self, width=LOGO_WIDTH, height=LOGO_HEIGHT):
+        super().__init__(LOGO_PATH, width=width, height=height, mask=None)
+        self._img = logo_reader(width, height)
+
+class Bookmark(Flowable):
+    # Takes no space, adds an outline entry pointing to the page it lands on.
+    # key must be unique within the PDF; level 1 entries nest under the level 0 entry before them.
+    def __init__(self, key, title, level=0):
+        super().__init__()
+        self.key = key
+        self.title = title
+        self.level = level
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        self.canv.bookmarkPage(self.key)
+        self.canv.addOutlineEntry(self.title, self.key, level=self.level)
+        # Open the outline panel when the PDF is opened
+        self.canv.showOutline()
+
+def warm_up():
+    register_fonts()
+    logo_reader(LOGO_WIDTH, LOGO_HEIGHT)
+
+class SharedParagraphStyle(ParagraphStyle):
+    # The styles below are shared by all requests (and threads), so they can't be changed after they are built.
+    # Derive a new ParagraphStyle with parent=... instead.
+    def __setattr__(self, name, value):
+        if self.__dict__.get('_frozen'):
+            raise AttributeError(f"Shared style '{self.name}' can't be changed")
+        super().__setattr__(name, value)
+
+class SharedTableStyle(TableStyle):
+    def add(self, *cmd):
+        raise AttributeError("Shared table style can't be changed")
+
+    def getCommands(self):
+        return list(self._cmds)
+
+def paragraph_style(name, parent=None, **kwargs):
+    # A parent from getSampleStyleSheet() is copied, so the sample sheet is never touched
+    if parent is not None and not isinstance(parent, SharedParagraphStyle):
+        kwargs = {**{k: v for k, v in parent.__dict__.items() if k not in ('name', 'parent')}, **kwargs}
+        parent = None
+    style = SharedParagraphStyle(name, parent=parent, **kwargs)
+    style.__dict__['_frozen'] = True
+    return style
+
+sample_styles = getSampleStyleSheet()
+
+# Workbook reports (DejaVu)
+NORMAL = paragraph_style('Normal', sample_styles['Normal'], fontName='DejaVuSans', fontSize=9, leading=12)
+HEADING1 = paragraph_style('Heading1', sample_styles['Heading1'], fontName='DejaVuSans-Bold', fontSize=14, spaceAfter=12)
+HEADING2 = paragraph_style('Heading2', sample_styles['Heading2'], fontName='DejaVuSans-Bold', fontSize=12, spaceAfter=6)
+HEADING2_NOBOLD = paragraph_style('Heading2', sample_styles['Heading2'], fontName='DejaVuSans', fontSize=12, spaceAfter=6)
+HEADING_CENTER = paragraph_style('HeadingCenter', HEADING1, alignment=TA_CENTER, fontSize=16, spaceAfter=12)
+
+# Analiza nastave / Evidencija drzanja nastave
+TITLE_CENTER = paragraph_style('HeadingCenter', sample_styles['Heading1'], fontName='DejaVuSans-Bold', fontSize=16,
+                               alignment=TA_CENTER, spaceAfter=12)
+SHEET_TITLE = paragraph_style('SheetTitle', sample_styles['Heading2'], fontName='DejaVuSans-Bold', fontSize=14)
+CELL = paragraph_style('CellStyle', NORMAL, fontSize=9, leading=12, spaceBefore=3, spaceAfter=3)
+HEADER_CELL = paragraph_style('HeaderStyle', NORMAL, fontName='DejaVuSans-Bold', fontSize=9, leading=12,
+                              spaceBefore=3, spaceAfter=3, textColor=colors.white)
+
+# Osnovni podaci
+OP_SHEET_TITLE = paragraph_style('SheetTitle', HEADING2_NOBOLD, fontSize=16, fontName='DejaVuSans-Bold')
+OP_SECTION_HEADER = paragraph_style('SectionHeader', HEADING2_NOBOLD, fontName='DejaVuSans-Bold', fontSize=14,
+                                    spaceAfter=8, leading=18)
+
+# Opterecenje (Microsoft Sans Serif)
+OPT_COLUMN_HEADER = paragraph_style('BodyText', sample_styles['BodyText'], fontName='Microsoft Sans Serif', alignment=TA_CENTER)
+OPT_BODY = paragraph_style('BodyText', fontName='Microsoft Sans Serif', fontSize=10, textColor='black')
+OPT_BODY_BOLD = paragraph_style('BodyTextBold', fontName='Microsoft Sans Serif Bold', fontSize=10, textColor='black')
+OPT_BODY_ITALIC = paragraph_style('BodyTextItalic', fontName='Microsoft Sans Serif Italic', fontSize=10, textColor='black')
+OPT_TITLE = paragraph_style('SpecialCell', fontName='Microsoft Sans Serif', fontSize=18, alignment=TA_LEFT, textColor='black')
+
+# Header row with the logo, professor name and sheet title
+HEADER_TABLE_STYLE = SharedTableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (0, 0), 'LEFT'),    # Logo aligned left
+    ('ALIGN', (1, 0), (1, 0), 'CENTER'),  # Professor name centered
+    ('ALIGN', (2, 0), (2, 0), 'RIGHT'),   # Sheet title aligned right
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+])
+
+IZVESTAJ_HEADER_TABLE_STYLE = SharedTableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+    ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+    ('ALIGN', (2, 0), (2, 0), 'RIGHT'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+])
+
+AN_TABLE1_STYLE = SharedTableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1242F1')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),  # Left align first column
+    ('ALIGN', (1, 0), (-1, -1), 'CENTER'),  # Center align other columns
+    ('FONTNAME', (0, 0), (-1, 0), 'DejaVuSans-Bold'),
+    ('FONTNAME', (0, 1), (-1, -1), 'DejaVuSans'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+    ('LEFTPADDING', (0, 0), (-1, -1), 5),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 5),
+])
+
+AN_TABLE2_STYLE = SharedTableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1242F1')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),  # Left align first column
+    ('ALIGN', (1, 0), (1, -1), 'CENTER'),  # Center align second column
+    ('FONTNAME', (0, 0), (-1, 0), 'DejaVuSans-Bold'),
+    ('FONTNAME', (0, 1), (-1, -1), 'DejaVuSans'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+    ('LEFTPADDING', (0, 0), (-1, -1), 5),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 5),
+])
+
+EDN_TABLE_STYLE = SharedTableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'DejaVuSans'),
+    ('FONTNAME', (0, 0), (-1, 0), 'DejaVuSans-Bold'),  # Bold only first row
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.lightgrey),
+    # Background color for header row
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1242F1')),
+    ('PADDING', (0, 0), (-1, -1), 4),
+    ('LEFTPADDING', (0, 0), (-1, -1), 3),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+    ('TOPPADDING', (0, 0), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+])
+
+# Section tables of Izvestaj o radu and Osnovni podaci
+GRID_TABLE_STYLE = SharedTableStyle([
+    ('BOX', (0,0), (-1,-1), 1, colors.black),  # Outer border
+    ('VALIGN', (0,0), (-1,-1), 'TOP'),
+    ('PADDING', (0,0), (-1,-1), 6),
+    ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),  # Grid between all cells
+])
+
+BOX_TABLE_STYLE = SharedTableStyle([
+    ('BOX', (0,0), (-1,-1), 1, colors.black),
+    ('PADDING', (0,0), (-1,-1), 6),
+])
+
+OP_BASIC_TABLE_STYLE = SharedTableStyle([
+    ('BOX', (0,0), (-1,-1), 1, colors.black),  # Outer border
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+    ('PADDING', (0,0), (-1,-1), 6),
+    ('GRID', (0,0), (-1,-1), 1, colors.lightgrey)
+])
+
+# Opterecenje tables
+OPT_TITLE_TABLE_STYLE = SharedTableStyle([
+    ("ALIGN", (0, 0), (-1, -1), "LEFT"),  # Align left
+    ("FONTNAME", (0, 0), (-1, -1), "Microsoft Sans Serif"),
+    ("FONTSIZE", (0, 0), (-1, -1), 14),  # Adjust font size as needed
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 10),  # Add space below the text
+])
+
+OPT_COLUMN_TABLE_STYLE = SharedTableStyle([
+    ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+    ("VALIGN", (0, 0), (-1, 0), "MIDDLE"),
+    ("BACKGROUND", (0, 0), (-1, 0), colors.white),  # Header background
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
+    ("GRID", (0, 0), (-1, -1), 1, colors.black),
+])
+
+OPT_OSNOVNE_TABLE_STYLE = SharedTableStyle([
+    # Header Row: Center horizontally and vertically
+    ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+    ("VALIGN", (0, 0), (-1, 0), "BOTTOM"),
+    ("BACKGROUND", (0, 0), (-1, 0), colors.white),  # Header background
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),  # Header text color
+
+    # Data Rows: Left-align horizontally, center vertically
+    ("ALIGN", (0, 1), (-1, -1), "LEFT"),
+    ("VALIGN", (0, 1), (-1, -1), "BOTTOM"),
+    ("BACKGROUND", (0, 1), (-1, -1), colors.white),
+    ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
+
+    # Grid lines for the whole table
+    ("GRID", (0, 0), (-1, -1), 1, colors.black),
+])
+
+OPT_MASTER_TABLE_STYLE = SharedTableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.white),  # Header background color
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),  # Header text color
+    ("ALIGN", (0, 0), (-1, 0), "CENTER"),  # Center align column headers horizontally
+    ("VALIGN", (0, 0), (-1, 0), "MIDDLE"),  # Center align column headers vertically
+    ("GRID", (0, 0), (-1, -1), 1, colors.black),
+])
+
+OPT_SUMMARY_OSNOVNE_TABLE_STYLE = SharedTableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.lightblue),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
+    ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
+    ("FONTNAME", (0, 0), (0, 0), "Microsoft Sans Serif Italic"),
+    ("FONTNAME", (0, 1), (-1, -1), "Microsoft Sans Serif"),
+    ("GRID", (0, 0), (-1, -1), 1, colors.black),
+])
+
+OPT_SUMMARY_MASTER_TABLE_STYLE = SharedTableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.lightcoral),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
+    ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
+    ("FONTNAME", (0, 0), (0, 0), "Microsoft Sans Serif Italic"),
+    ("FONTNAME", (0, 1), (-1, -1), "Microsoft Sans Serif"),
+    ("GRID", (0, 0), (-1, -1), 1, colors.black),
+])
+
+OPT_TOTAL_TABLE_STYLE = SharedTableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.lightgreen),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
+    ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
+    ("FONTNAME", (0, 0), (0, 0), "Microsoft Sans Serif Bold"),
+    ("FONTNAME", (0, 0), (-1, 0), "Microsoft Sans Serif Bold"),
+    ("GRID", (0, 0), (-1, -1), 1, colors.black),
+])
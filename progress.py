@@ -0,0 +1,101 @@
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+
+# Progress of long running requests, published as server-sent events on /progress/<progress_id>.
+# The browser picks the id (or uses the batch job id), subscribes, and sends the id with its request.
+# Every channel keeps its events, so a subscriber that connects late still gets the whole history.
+MAX_CHANNELS = 500
+CHANNEL_TTL = 10 * 60
+KEEPALIVE_SECONDS = 15
+# How long a subscriber waits for the first event of its id (the browser subscribes before it sends the request)
+SUBSCRIBE_TIMEOUT = 60
+PROGRESS_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+channels = OrderedDict()
+channels_lock = threading.Condition()
+
+def valid_id(progress_id):
+    return bool(progress_id) and PROGRESS_ID_PATTERN.match(progress_id) is not None
+
+def get_channel(progress_id):
+    # Called with channels_lock held. Only publish() creates channels, subscribers never do.
+    channel = channels.get(progress_id)
+    if channel is None:
+        now = time.time()
+        # Drop channels nobody needs anymore, and the oldest ones if there are too many
+        for old_id in [old_id for old_id, old in channels.items() if now - old['updated'] > CHANNEL_TTL]:
+            del channels[old_id]
+        while len(channels) >= MAX_CHANNELS:
+            channels.popitem(last=False)
+        channel = channels[progress_id] = {'events': [], 'closed': False, 'updated': now}
+    return channel
+
+def publish(progress_id, stage, message, **data):
+    # stage is a short machine readable name ('upload', 'parsed', 'rendered', ...), message is shown to the user
+    if not valid_id(progress_id):
+        return
+    with channels_lock:
+        channel = get_channel(progress_id)
+        if channel['closed']:
+            return
+        channel['events'].append(('progress', {'stage': stage, 'message': message, **data}))
+        channel['updated'] = time.time()
+        channels_lock.notify_all()
+
+def close(progress_id, error=None):
+    # Last event of a channel, the stream ends after it
+    if not valid_id(progress_id):
+        return
+    with channels_lock:
+        channel = channels.get(progress_id)
+        if channel is None or channel['closed']:
+            return
+        channel['events'].append(('end', {'error': error}))
+        channel['closed'] = True
+        channel['updated'] = time.time()
+        channels_lock.notify_all()
+
+def end_event(error):
+    return f"event: end\ndata: {json.dumps({'error': error})}\n\n"
+
+def stream(progress_id):
+    # Generator of SSE messages for one subscriber. It only looks channels up: the stream follows the
+    # channel that was there when it first found one, and ends when that channel expires, is evicted
+    # or is replaced by a newer one with the same id.
+    sent = 0
+    subscribed = None
+    started = time.time()
+    while True:
+        events = []
+        error = None
+        keepalive = False
+        with channels_lock:
+            channel = channels.get(progress_id)
+            if subscribed is None:
+                subscribed = channel
+            if channel is not subscribed or (channel is not None and sent > len(channel['events'])):
+                error = 'expired'
+            elif channel is None and time.time() - started > SUBSCRIBE_TIMEOUT:
+                # Nothing was published for this id
+                error = 'timeout'
+            elif channel is not None and time.time() - channel['updated'] > CHANNEL_TTL:
+                error = 'timeout'
+            else:
+                if channel is not None:
+                    events = channel['events'][sent:]
+                if not events:
+                    keepalive = not channels_lock.wait(KEEPALIVE_SECONDS)
+        if error:
+            yield end_event(error)
+            return
+        if keepalive:
+            # Comment line, keeps proxies from closing an idle connection
+            yield ": keep-alive\n\n"
+        for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+            sent += 1
+            if event == 'end':
+                return
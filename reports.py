@@ -0,0 +1,109 @@
+import io
+import time
+from contextlib import closing
+from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate, NextPageTemplate, PageBreak
+import pdf_styles
+import metrics
+
+# The reports made from one teacher's workbook, in the order of the combined PDF (/generate_all)
+REPORT_TITLES = {
+    'an': "Analiza nastave",
+    'edn': "Evidencija držanja nastave",
+    'izvestaj': "Izveštaj o radu",
+    'op': "Osnovni podaci",
+}
+
+def report_module(report_type):
+    if report_type == 'an':
+        import generate_pdf_testing_AN as module
+    elif report_type == 'edn':
+        import generate_pdf_testing_EDN as module
+    elif report_type == 'izvestaj':
+        import generate_pdf_izvestaj_o_radu_konacno as module
+    else:
+        import generate_pdf_testing_OP as module
+    return module
+
+def extract_report(report_type, source, selected_sheet=None):
+    # Returns (data, professor_name); data is None if the workbook has nothing usable for this report.
+    # source is a path, a file object or an open workbook (workbook_utils.opened).
+    module = report_module(report_type)
+    if report_type == 'an':
+        return module.process_analiza_nastave(source)
+    if report_type == 'edn':
+        return module.process_excel(source)
+    if report_type == 'izvestaj':
+        data, professor_name, _ = module.process_excel(source, selected_sheet)
+        return data, professor_name
+    data = module.process_excel(source)
+    return data, module.get_professor_name_from_data(data) if data else None
+
+def build_story(report_type, doc, data, professor_name, outline_level=0):
+    module = report_module(report_type)
+    if report_type == 'op':
+        return module.build_story(doc, data)
+    if report_type == 'izvestaj':
+        # Months of a whole-year Izveštaj o radu get their own bookmarks, nested under the report's
+        return module.build_story(doc, data, professor_name, outline_level)
+    return module.build_story(doc, data, professor_name)
+
+def render_report(report_type, data, professor_name):
+    # PDF of one report as bytes. Top-level so it can run in the batch worker processes.
+    pdf_buffer = io.BytesIO()
+    doc = report_module(report_type).make_doc(pdf_buffer)
+    with metrics.span('layout', report_type):
+        story = build_story(report_type, doc, data, professor_name)
+    with metrics.span('build', report_type):
+        doc.build(story)
+    return pdf_buffer.getvalue()
+
+def render_combined(reports):
+    # One PDF with every report of reports = [(report_type, data, professor_name)], each starting on a
+    # new page with its own page size and margins and its own bookmark
+    pdf_styles.register_fonts()
+    pdf_buffer = io.BytesIO()
+    combined = BaseDocTemplate(pdf_buffer, title="Svi izveštaji")
+    templates = {}
+    story = []
+    layout_start = time.perf_counter()
+    for report_type, data, professor_name in reports:
+        # The report's own document is only used for its page layout, it is never built
+        layout = report_module(report_type).make_doc(None)
+        template_id = f"{layout.pagesize[0]:.0f}x{layout.pagesize[1]:.0f}"
+        if template_id not in templates:
+            frame = Frame(layout.leftMargin, layout.bottomMargin, layout.width, layout.height, id=template_id)
+            templates[template_id] = PageTemplate(id=template_id, frames=[frame], pagesize=layout.pagesize)
+        if story:
+            story.append(NextPageTemplate(template_id))
+            story.append(PageBreak())
+        else:
+            # The first page uses the first template
+            first_template_id = template_id
+        story.append(pdf_styles.Bookmark(report_type, REPORT_TITLES[report_type]))
+        story.extend(build_story(report_type, layout, data, professor_name, outline_level=1))
+    combined.addPageTemplates([templates[first_template_id]] + [t for t_id, t in templates.items() if t_id != first_template_id])
+    metrics.observe('layout', time.perf_counter() - layout_start, 'sve')
+    with metrics.span('build', 'sve'):
+        combined.build(story)
+    return pdf_buffer.getvalue()
+
+def render_workbook(data, report_types, selected_sheet=None):
+    # Every report in report_types for one teacher's workbook (bulk upload, /generate_bulk).
+    # Runs in the batch worker processes. Returns (professor_name, {report_type: pdf bytes}, {report_type: error}).
+    from workbook_utils import open_workbook
+    professor_name = ''
+    pdfs = {}
+    errors = {}
+    with closing(open_workbook(io.BytesIO(data))) as workbook:
+        for report_type in report_types:
+            try:
+                report_data, name = extract_report(report_type, workbook, selected_sheet)
+                if not report_data:
+                    errors[report_type] = "nema podataka u Excel fajlu"
+                    continue
+                professor_name = professor_name or name or ''
+                pdfs[report_type] = render_report(report_type, report_data, name or '')
+            except Exception as e:
+                print(f"Error generating {report_type} PDF: {str(e)}")
+                errors[report_type] = str(e)
+    return professor_name, pdfs, errors
@@ -0,0 +1,188 @@
+import zipfile
+from contextlib import contextmanager
+from xml.etree import ElementTree
+import numpy as np
+import pandas as pd
+import openpyxl
+from openpyxl.cell.cell import ERROR_CODES
+
+# Sheets that are not monthly reports
+EXCLUDED_SHEETS = ["Analiza nastave", "Evidencija drzanja nastave", "Osnovni podaci", "PadajucaLista"]
+
+# Rows per block handed to the vectorized extractors (iter_row_blocks)
+ROW_BLOCK_SIZE = 1024
+EXCEL_ERRORS = set(ERROR_CODES)
+
+# The extractors read from a source: a path, a binary file object or a workbook already opened with
+# open_workbook (one open workbook shared by all reports of a request). A path or file is opened
+# by the extractor itself and closed when it is done.
+
+class ExcelFileWorkbook:
+    # Old .xls workbooks, which openpyxl can't read, go through pandas (xlrd) like they did before
+    # the streaming reader. A sheet is parsed whole when it is read, the rows are then handed out
+    # the way openpyxl streams them.
+    def __init__(self, filepath):
+        if hasattr(filepath, 'seek'):
+            filepath.seek(0)
+        self.excel_file = pd.ExcelFile(filepath)
+        self.sheetnames = self.excel_file.sheet_names
+
+    def iter_rows(self, sheet_name):
+        df = self.excel_file.parse(sheet_name, header=None)
+        for row in df.itertuples(index=False, name=None):
+            yield tuple(None if pd.isna(value) else value for value in row)
+
+    def close(self):
+        self.excel_file.close()
+
+def open_workbook(filepath):
+    # openpyxl in read-only mode: only the sheet catalogue and the shared strings are loaded,
+    # the sheets are streamed from the file row by row when they are read.
+    # filepath can also be an open binary file object.
+    if not zipfile.is_zipfile(filepath):
+        return ExcelFileWorkbook(filepath)
+    if hasattr(filepath, 'seek'):
+        filepath.seek(0)
+    return openpyxl.load_workbook(filepath, read_only=True, data_only=True, keep_links=False)
+
+def is_workbook(source):
+    return isinstance(source, (openpyxl.Workbook, ExcelFileWorkbook))
+
+@contextmanager
+def opened(source):
+    # The workbook of source. One opened here is closed on exit, one passed in is left to its owner.
+    if is_workbook(source):
+        yield source
+        return
+    workbook = open_workbook(source)
+    try:
+        yield workbook
+    finally:
+        workbook.close()
+
+def sheet_rows(workbook, sheet_name):
+    # The rows of a sheet of an open workbook as tuples of cell values
+    if isinstance(workbook, ExcelFileWorkbook):
+        return workbook.iter_rows(sheet_name)
+    worksheet = workbook[sheet_name]
+    # The dimensions saved in the file can be wrong, every row is read as long as it really is
+    worksheet.reset_dimensions()
+    return worksheet.iter_rows(values_only=True)
+
+def convert_cell(value):
+    # The value pandas.read_excel would give: NaN for empty and error cells, whole numbers as int
+    if value is None:
+        return np.nan
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str) and (value == "" or value in EXCEL_ERRORS):
+        return np.nan
+    return value
+
+def iter_rows(source, sheet_name):
+    # The rows of a sheet as lists, one at a time. Trailing empty cells are left off (like pandas does
+    # before padding), so rows can have different lengths. Hidden rows are read as well.
+    with opened(source) as workbook:
+        for row in sheet_rows(workbook, sheet_name):
+            row = list(row)
+            while row and (row[-1] is None or row[-1] == ""):
+                row.pop()
+            yield [convert_cell(value) for value in row]
+
+def iter_row_blocks(source, sheet_name, block_rows=ROW_BLOCK_SIZE):
+    # iter_rows in blocks of up to block_rows rows, each a 2-D object array padded with NaN to its
+    # widest row. The extractors run their vectorized steps one block at a time, so memory stays
+    # bounded by the block size, not the sheet size.
+    block = []
+    for row in iter_rows(source, sheet_name):
+        block.append(row)
+        if len(block) == block_rows:
+            yield rows_to_array(block)
+            block = []
+    if block:
+        yield rows_to_array(block)
+
+def rows_to_array(rows):
+    values = np.full((len(rows), max(1, max(len(row) for row in rows))), np.nan, dtype=object)
+    for i, row in enumerate(rows):
+        values[i, :len(row)] = row
+    return values
+
+def normalize_cells(values):
+    # Every cell as a stripped string, "" for empty cells, as a 2-D object array.
+    # Only the cells that hold something are converted, so blank trailing columns cost next to nothing.
+    cells = np.full(values.shape, "", dtype=object)
+    present = pd.notna(values)
+    if present.any():
+        cells[present] = pd.Series(values[present], dtype=object).astype(str).str.strip().to_numpy(dtype=object)
+    return cells
+
+def first_cells(cells):
+    # Lowercased first non-empty cell of every row ("" for empty rows), and which rows have any data
+    filled = cells != ""
+    has_data = filled.any(axis=1) if cells.shape[1] else np.zeros(len(cells), dtype=bool)
+    if not cells.size:
+        return np.full(len(cells), "", dtype=object), has_data
+    first = cells[np.arange(len(cells)), filled.argmax(axis=1)]
+    return pd.Series(first, dtype=object).str.lower().to_numpy(dtype=object), has_data
+
+def columns_b_to_e(cells):
+    # Columns B-E of every row as tuples, narrow sheets are padded with ""
+    block = cells[:, 1:5]
+    if block.shape[1] < 4:
+        block = np.hstack([block, np.full((len(cells), 4 - block.shape[1]), "", dtype=object)])
+    return [tuple(row) for row in block.tolist()]
+
+def scan_sections(source, sheet_name):
+    # What the section extractors (Izveštaj o radu, Osnovni podaci) need from a sheet, streamed block by
+    # block: the lowercased first cell of every row, which rows have data, and columns B-E of every row
+    firsts, has_datas, rows = [], [], []
+    for block in iter_row_blocks(source, sheet_name):
+        cells = normalize_cells(block)
+        first, has_data = first_cells(cells)
+        firsts.append(first)
+        has_datas.append(has_data)
+        rows.extend(columns_b_to_e(cells))
+    if not rows:
+        return np.empty(0, dtype=object), np.empty(0, dtype=bool), rows
+    return np.concatenate(firsts), np.concatenate(has_datas), rows
+
+def list_sheet_names(filepath):
+    # Read only the sheet catalogue (xl/workbook.xml) from the xlsx container, no cell data is loaded.
+    # filepath can also be an open binary file object.
+    if zipfile.is_zipfile(filepath):
+        with zipfile.ZipFile(filepath) as archive:
+            if 'xl/workbook.xml' in archive.namelist():
+                root = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+                return [el.get('name') for el in root.iter() if el.tag.rsplit('}', 1)[-1] == 'sheet']
+    # Old .xls files (and unusual containers) go through pandas
+    if hasattr(filepath, 'seek'):
+        filepath.seek(0)
+    return pd.ExcelFile(filepath).sheet_names
+
+def get_sheet_names(source):
+    if is_workbook(source):
+        return list(source.sheetnames)
+    return list_sheet_names(source)
+
+def get_monthly_sheets(source):
+    return [sheet for sheet in get_sheet_names(source) if sheet not in EXCLUDED_SHEETS]
+
+def get_professor_name(source):
+    # "Osnovni podaci" has the labels in column B and the values in column C; the first "Ime" and
+    # "Prezime" rows are used and the rest of the sheet isn't read
+    ime = prezime = None
+    with opened(source) as workbook:
+        for row in iter_rows(workbook, "Osnovni podaci"):
+            label = row[1] if len(row) > 1 else None
+            if label == "Ime" and ime is None:
+                ime = row[2] if len(row) > 2 else np.nan
+            elif label == "Prezime" and prezime is None:
+                prezime = row[2] if len(row) > 2 else np.nan
+            if ime is not None and prezime is not None:
+                break
+
+    if ime is None or prezime is None:
+        raise ValueError('Could not find "Ime" or "Prezime" in "Osnovni podaci" sheet')
+
+    return f"{str(ime).strip()} {str(prezime).strip()}"